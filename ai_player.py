@@ -2,11 +2,21 @@
 AI Player - Intelligent computer opponent for Five Crowns
 """
 
-from typing import List, Tuple, Optional
-from five_crowns import Card, MeldValidator
+from collections import Counter, OrderedDict
+from typing import Dict, List, Tuple, Optional
+from five_crowns import Card, MeldValidator, RANK_MASK, SUIT_MASK, RANK_POINTS
 from meld_finder import MeldFinder
 from game_engine import Player, GameState
 
+# Run-potential bonus indexed by rank distance to another card of the same suit:
+# adjacent (+20), one card away (+10, could fill with wild), two away (+5)
+_DISTANCE_WEIGHTS = (0, 20, 10, 5, 0, 0, 0, 0, 0, 0, 0)
+
+# Sliding-window LRU of usefulness scores keyed on (card, hand multiset, wild index)
+_USEFULNESS_CACHE_SIZE = 256
+_USEFULNESS_CACHE_MAX_HAND = 14  # Largest hand: 13 dealt + 1 drawn
+_usefulness_cache: "OrderedDict[Tuple[int, Tuple[int, ...], int], float]" = OrderedDict()
+
 
 class AIStrategy:
     """AI strategy for playing Five Crowns"""
@@ -21,67 +31,91 @@ class AIStrategy:
         - Cards with duplicates (for books)
         - Cards in sequence (for runs)
         """
+        return AIStrategy._evaluate_card_usefulness_idx(card, hand, MeldValidator.wild_index(wild_rank))
+
+    @staticmethod
+    def _evaluate_card_usefulness_idx(card: Card, hand: List[Card], wild_idx: int) -> float:
+        """evaluate_card_usefulness with a pre-resolved wild index, memoized per hand"""
+        if len(hand) > _USEFULNESS_CACHE_MAX_HAND:
+            rank_counts, card_counts, by_suit = AIStrategy._build_hand_tables(hand, wild_idx)
+            return AIStrategy._evaluate_card_usefulness_fast(card, rank_counts, card_counts, by_suit, wild_idx)
+
+        key = (card.code, tuple(sorted(c.code for c in hand)), wild_idx)
+        score = _usefulness_cache.get(key)
+        if score is not None:
+            _usefulness_cache.move_to_end(key)
+            return score
+
+        rank_counts, card_counts, by_suit = AIStrategy._build_hand_tables(hand, wild_idx)
+        score = AIStrategy._evaluate_card_usefulness_fast(card, rank_counts, card_counts, by_suit, wild_idx)
+        _usefulness_cache[key] = score
+        if len(_usefulness_cache) > _USEFULNESS_CACHE_SIZE:
+            _usefulness_cache.popitem(last=False)  # Evict least recently used
+        return score
+
+    @staticmethod
+    def _build_hand_tables(hand: List[Card], wild_idx: int) -> Tuple[Counter, Counter, Dict[int, List[int]]]:
+        """
+        Summarize a hand once for repeated usefulness evaluations.
+        Returns (rank_counts, card_counts, by_suit): counts keyed by rank index
+        and by card code, and each suit bit mapped to the sorted rank indices of
+        its non-wild cards.
+        """
+        rank_counts = Counter(c.code & RANK_MASK for c in hand)
+        card_counts = Counter(c.code for c in hand)
+        by_suit: Dict[int, List[int]] = {}
+        for c in hand:
+            if not MeldValidator.is_wild_code(c.code, wild_idx):
+                by_suit.setdefault(c.code & SUIT_MASK, []).append(c.code & RANK_MASK)
+        for ranks in by_suit.values():
+            ranks.sort()
+        return rank_counts, card_counts, by_suit
+
+    @staticmethod
+    def _evaluate_card_usefulness_fast(card: Card, rank_counts: Counter, card_counts: Counter,
+                                       by_suit: Dict[int, List[int]], wild_idx: int) -> float:
+        """Usefulness score computed from precomputed hand tables (see _build_hand_tables)"""
         score = 0.0
+        code = card.code
 
         # Wild cards are extremely useful
-        if MeldValidator.is_wild(card, wild_rank):
+        if MeldValidator.is_wild_code(code, wild_idx):
             return 100.0
 
-        # Count duplicates of same rank (useful for books)
-        same_rank = sum(1 for c in hand if c.rank == card.rank and c != card)
+        # Count duplicates of same rank (useful for books); identical copies don't count
+        card_rank_value = code & RANK_MASK
+        same_rank = rank_counts[card_rank_value] - card_counts[code]
         score += same_rank * 15  # Each duplicate adds value
 
-        # Count cards of same suit (useful for runs)
-        same_suit = [c for c in hand if c.suit == card.suit and c != card and not MeldValidator.is_wild(c, wild_rank)]
-
-        if same_suit:
-            # Sort to check for sequences
-            same_suit_sorted = sorted(same_suit, key=lambda c: MeldValidator.RANK_VALUES[c.rank])
-            card_rank_value = MeldValidator.RANK_VALUES[card.rank]
-
-            # Check if card is adjacent to or near other cards of same suit
-            for other in same_suit_sorted:
-                other_rank_value = MeldValidator.RANK_VALUES[other.rank]
-                distance = abs(card_rank_value - other_rank_value)
-
-                if distance == 1:  # Adjacent cards
-                    score += 20
-                elif distance == 2:  # One card away (could fill with wild)
-                    score += 10
-                elif distance == 3:  # Two cards away
-                    score += 5
+        # Check if card is adjacent to or near other cards of same suit (useful for runs)
+        score += sum(_DISTANCE_WEIGHTS[abs(card_rank_value - other_rank_value)]
+                     for other_rank_value in by_suit.get(code & SUIT_MASK, ()))
 
         # Lower value cards are slightly less useful (easier to go out with low points)
-        card_points = AIStrategy._get_card_points(card, wild_rank)
-        score -= card_points * 0.5
+        score -= RANK_POINTS[card_rank_value] * 0.5  # Not wild, so face/court value
 
         return score
 
-    @staticmethod
-    def _get_card_points(card: Card, wild_rank: str) -> int:
-        """Get point value of a card"""
-        if MeldValidator.is_wild(card, wild_rank):
-            return 20
-        elif card.rank in ['J', 'Q', 'K']:
-            return 10
-        else:
-            return int(card.rank)
-
     @staticmethod
     def decide_draw_source(hand: List[Card], discard_top: Optional[Card], wild_rank: str) -> bool:
         """
         Decide whether to draw from discard pile or deck.
         Returns True to draw from discard, False to draw from deck.
         """
+        return AIStrategy._decide_draw_source_idx(hand, discard_top, MeldValidator.wild_index(wild_rank))
+
+    @staticmethod
+    def _decide_draw_source_idx(hand: List[Card], discard_top: Optional[Card], wild_idx: int) -> bool:
+        """decide_draw_source with a pre-resolved wild index"""
         if discard_top is None:
             return False  # Must draw from deck
 
         # Always take wilds from discard
-        if MeldValidator.is_wild(discard_top, wild_rank):
+        if MeldValidator.is_wild_code(discard_top.code, wild_idx):
             return True
 
         # Check if discard card is useful
-        discard_usefulness = AIStrategy.evaluate_card_usefulness(discard_top, hand, wild_rank)
+        discard_usefulness = AIStrategy._evaluate_card_usefulness_idx(discard_top, hand, wild_idx)
 
         # Take from discard if usefulness is high
         # Threshold: if usefulness > 25, it's worth taking
@@ -93,18 +127,23 @@ class AIStrategy:
         Decide which card to discard from hand.
         Discards the least useful card.
         """
+        return AIStrategy._decide_discard_idx(hand, MeldValidator.wild_index(wild_rank))
+
+    @staticmethod
+    def _decide_discard_idx(hand: List[Card], wild_idx: int) -> Card:
+        """decide_discard with a pre-resolved wild index"""
         if not hand:
             raise ValueError("Cannot discard from empty hand")
 
-        # Evaluate usefulness of each card
-        card_scores = []
-        for card in hand:
-            usefulness = AIStrategy.evaluate_card_usefulness(card, hand, wild_rank)
-            card_scores.append((card, usefulness))
+        # Summarize the hand once, then evaluate usefulness of each card
+        rank_counts, card_counts, by_suit = AIStrategy._build_hand_tables(hand, wild_idx)
+        scores = [
+            AIStrategy._evaluate_card_usefulness_fast(card, rank_counts, card_counts, by_suit, wild_idx)
+            for card in hand
+        ]
 
-        # Sort by usefulness (ascending) and discard least useful
-        card_scores.sort(key=lambda x: x[1])
-        return card_scores[0][0]
+        # Discard least useful (first one on ties, as the stable sort did)
+        return hand[min(range(len(hand)), key=scores.__getitem__)]
 
     @staticmethod
     def should_go_out(hand: List[Card], wild_rank: str, game_state: GameState) -> Tuple[bool, Optional[List[List[Card]]]]:
@@ -136,10 +175,11 @@ class AIStrategy:
         action can be: 'continue', 'go_out'
         """
         wild_rank = game_state.get_wild_rank()
+        wild_idx = MeldValidator.wild_index(wild_rank)
         discard_top = game_state.deck.peek_discard()
 
         # Step 1: Decide whether to draw from discard or deck
-        from_discard = AIStrategy.decide_draw_source(player.hand, discard_top, wild_rank)
+        from_discard = AIStrategy._decide_draw_source_idx(player.hand, discard_top, wild_idx)
 
         # Step 2: Draw card (this is handled externally by game engine)
         # For now, return the decision
@@ -167,18 +207,18 @@ class AIPlayer:
         Returns (went_out, turn_info)
         where turn_info contains: {'draw_source': str, 'drew_card': Card, 'discarded': Card or None}
         """
-        from game_engine import GameEngine
-
+        # Wild rank and discard top are fixed until we draw; read them once
         state = game_engine.state
         wild_rank = state.get_wild_rank()
+        wild_idx = MeldValidator.wild_index(wild_rank)
+        discard_top = state.deck.peek_discard()
         turn_info = {}
 
         # Step 1: Draw a card
-        discard_top = state.deck.peek_discard()
-        from_discard = AIStrategy.decide_draw_source(player.hand, discard_top, wild_rank)
+        from_discard = AIStrategy._decide_draw_source_idx(player.hand, discard_top, wild_idx)
 
         # Draw the card
-        if from_discard and game_engine.can_draw_from_discard():
+        if from_discard and discard_top is not None:
             drawn_card = game_engine.draw_card(from_discard=True)
             turn_info['draw_source'] = 'discard'
         else:
@@ -199,7 +239,7 @@ class AIPlayer:
             # If failed for some reason, continue with discard
 
         # Step 3: Can't go out, so discard a card and end turn
-        card_to_discard = AIStrategy.decide_discard(player.hand, wild_rank)
+        card_to_discard = AIStrategy._decide_discard_idx(player.hand, wild_idx)
         game_engine.discard_card(card_to_discard)
         turn_info['discarded'] = card_to_discard
 
@@ -3,8 +3,16 @@ Five Crowns Card Game - Meld Validation Implementation
 """
 
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import List, Optional, Tuple
-from enum import Enum
+from enum import Enum, IntEnum
+
+__all__ = [
+    'Suit', 'Card', 'MeldError', 'ValidationResult', 'MeldValidator',
+    'create_card', 'create_joker', 'pooled_card', 'JOKER',
+    'RANK_MASK', 'SUIT_MASK', 'JOKER_INDEX', 'RANK_INDEX', 'SUIT_BITS',
+    'RANK_POINTS', 'WILD_POINTS', 'round_points',
+]
 
 
 class Suit(Enum):
@@ -16,27 +24,72 @@ class Suit(Enum):
     JOKER = "🃏"  # Joker suit (jokers are always wild)
 
 
-@dataclass
+# Integer card encoding: low 4 bits hold the rank index, one bit per suit above.
+# Equality, hashing and wild checks all work on this single int.
+RANK_MASK = 0x0F
+SUIT_MASK = 0x3F0
+JOKER_INDEX = 11
+RANK_INDEX = {rank: i for i, rank in enumerate(
+    ['3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'Joker']
+)}
+SUIT_BITS = {suit: 1 << (4 + i) for i, suit in enumerate(Suit)}
+
+# Points for a card left in hand, indexed by rank index (3-10 face value,
+# J/Q/K 10, Joker 20). Any wild card counts WILD_POINTS.
+RANK_POINTS = (3, 4, 5, 6, 7, 8, 9, 10, 10, 10, 10, 20)
+WILD_POINTS = 20
+
+
+@lru_cache(maxsize=None)
+def round_points(wild_rank: str) -> Tuple[int, ...]:
+    """RANK_POINTS for a round: the wild rank's slot scores WILD_POINTS too"""
+    points = list(RANK_POINTS)
+    wild_idx = RANK_INDEX.get(wild_rank, -1)
+    if wild_idx >= 0:
+        points[wild_idx] = WILD_POINTS
+    return tuple(points)
+
+
+@dataclass(frozen=True)
 class Card:
     rank: str  # '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'Joker'
     suit: Suit
     
+    # No per-instance __dict__ (dataclass(slots=True) would need Python 3.10+).
+    # 'code' is derived in __post_init__ rather than declared as a field.
+    __slots__ = ('rank', 'suit', 'code')
+    
+    def __post_init__(self):
+        object.__setattr__(self, 'code', SUIT_BITS[self.suit] | RANK_INDEX[self.rank])
+    
+    def __reduce__(self):
+        # Frozen slots can't be restored by setattr, so rebuild from rank/suit
+        return (Card, (self.rank, self.suit))
+    
     def __repr__(self):
         if self.rank == 'Joker':
             return "Joker"
         return f"{self.rank}{self.suit.value}"
     
     def __eq__(self, other):
-        return self.rank == other.rank and self.suit == other.suit
+        return self is other or self.code == other.code  # Pooled cards usually hit the identity check
     
     def __hash__(self):
-        return hash((self.rank, self.suit))
+        return self.code  # Already a unique small int
+
+
+class MeldError(IntEnum):
+    """Why validate_all_melds rejected a set of melds"""
+    TOO_FEW_CARDS = 1
+    NEITHER_BOOK_NOR_RUN = 2
 
 
 @dataclass
 class ValidationResult:
     is_valid: bool
     error_message: Optional[str] = None
+    error_code: Optional[MeldError] = None  # Machine-readable reason, for callers and tests
+    group_index: Optional[int] = None  # 0-based index of the meld that failed
 
 
 class MeldValidator:
@@ -46,6 +99,11 @@ class MeldValidator:
     RANK_ORDER = ['3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K']
     RANK_VALUES = {rank: i for i, rank in enumerate(RANK_ORDER)}
     
+    @staticmethod
+    def wild_index(wild_rank: str) -> int:
+        """Rank index of the round's wild rank (-1 if it isn't a known rank)"""
+        return RANK_INDEX.get(wild_rank, -1)
+    
     @staticmethod
     def get_wild_card(round_number: int) -> str:
         """
@@ -68,29 +126,62 @@ class MeldValidator:
         if not melds:
             return ValidationResult(True, None)
         
+        wild_idx = MeldValidator.wild_index(wild_card_rank)
+        
         for i, meld in enumerate(melds):
             if len(meld) < 3:
                 return ValidationResult(
                     False, 
-                    f"Group {i+1} has only {len(meld)} cards (need 3+)"
+                    f"Group {i+1} has only {len(meld)} cards (need 3+)",
+                    MeldError.TOO_FEW_CARDS, i
                 )
             
-            # Check if it's a valid book OR run
-            is_book = MeldValidator.is_valid_book(meld, wild_card_rank)
-            is_run = MeldValidator.is_valid_run(meld, wild_card_rank)
-            
-            if not (is_book or is_run):
+            if MeldValidator.meld_type_idx(meld, wild_idx) is None:
                 return ValidationResult(
                     False,
-                    f"Group {i+1} is neither a valid book nor run"
+                    f"Group {i+1} is neither a valid book nor run",
+                    MeldError.NEITHER_BOOK_NOR_RUN, i
                 )
         
         return ValidationResult(True, None)
     
+    @staticmethod
+    def meld_type(cards: List[Card], wild_rank: str) -> Optional[str]:
+        """
+        Classify a meld in one pass: 'book', 'run', or None if it's neither.
+        A meld that is both (one distinct non-wild card plus wilds) is a 'book'.
+        """
+        return MeldValidator.meld_type_idx(cards, MeldValidator.wild_index(wild_rank))
+    
+    @staticmethod
+    def meld_type_idx(cards: List[Card], wild_idx: int) -> Optional[str]:
+        """meld_type with a pre-resolved wild index (see wild_index)"""
+        # Fingerprint the non-wild ranks and suits: a book needs a single
+        # rank and a run a single suit, so at most one check can apply
+        # unless the meld has just one distinct non-wild card
+        rank_bits = 0
+        suit_bits = 0
+        for card in cards:
+            code = card.code
+            if not MeldValidator.is_wild_code(code, wild_idx):
+                rank_bits |= 1 << (code & RANK_MASK)
+                suit_bits |= code & SUIT_MASK
+        if rank_bits and not rank_bits & (rank_bits - 1) and MeldValidator.is_valid_book_idx(cards, wild_idx):
+            return 'book'
+        if suit_bits and not suit_bits & (suit_bits - 1) and MeldValidator.is_valid_run_idx(cards, wild_idx):
+            return 'run'
+        return None
+    
     @staticmethod
     def is_wild(card: Card, wild_rank: str) -> bool:
         """Check if a card is wild (jokers are always wild, plus the round's wild card)"""
-        return card.rank == wild_rank or card.rank == 'Joker'
+        return MeldValidator.is_wild_code(card.code, RANK_INDEX.get(wild_rank, -1))
+    
+    @staticmethod
+    def is_wild_code(code: int, wild_idx: int) -> bool:
+        """is_wild for a card code and a pre-resolved wild index (see wild_index)"""
+        rank = code & RANK_MASK
+        return rank == wild_idx or rank == JOKER_INDEX
     
     @staticmethod
     def is_valid_book(cards: List[Card], wild_rank: str) -> bool:
@@ -100,28 +191,25 @@ class MeldValidator:
         - No duplicate suits among non-wild cards
         - Must have at least one non-wild card
         """
+        return MeldValidator.is_valid_book_idx(cards, MeldValidator.wild_index(wild_rank))
+    
+    @staticmethod
+    def is_valid_book_idx(cards: List[Card], wild_idx: int) -> bool:
+        """is_valid_book with a pre-resolved wild index (see wild_index)"""
         if len(cards) < 3:
             return False
         
-        # Separate wilds from non-wilds
-        non_wilds = [c for c in cards if not MeldValidator.is_wild(c, wild_rank)]
-        
-        if not non_wilds:
-            return False  # Can't be all wilds - need at least one real card
-        
-        # All non-wilds must be same rank
-        target_rank = non_wilds[0].rank
-        if not all(c.rank == target_rank for c in non_wilds):
-            return False
-        
-        # Can't have duplicate suits (except wilds can be any suit)
-        suits_seen = set()
-        for card in non_wilds:
-            if card.suit in suits_seen:
-                return False  # Duplicate suit
-            suits_seen.add(card.suit)
+        # Fast path for the most common candidate: three cards, no wilds
+        if len(cards) == 3:
+            a, b, c = cards[0].code, cards[1].code, cards[2].code
+            ra, rb, rc = a & RANK_MASK, b & RANK_MASK, c & RANK_MASK
+            if (ra != wild_idx and ra != JOKER_INDEX and rb != wild_idx and rb != JOKER_INDEX
+                    and rc != wild_idx and rc != JOKER_INDEX):
+                # Same rank, so distinct suits means distinct codes
+                return ra == rb == rc and a != b and b != c and a != c
         
-        return True
+        sig = tuple(sorted(c.code for c in cards))
+        return _cached_is_valid_book(sig, wild_idx)
     
     @staticmethod
     def is_valid_run(cards: List[Card], wild_rank: str) -> bool:
@@ -131,111 +219,186 @@ class MeldValidator:
         - Cards must form a sequence (wilds can fill gaps or extend ends)
         - Must have at least one non-wild card
         """
+        return MeldValidator.is_valid_run_idx(cards, MeldValidator.wild_index(wild_rank))
+    
+    @staticmethod
+    def is_valid_run_idx(cards: List[Card], wild_idx: int) -> bool:
+        """is_valid_run with a pre-resolved wild index (see wild_index)"""
         if len(cards) < 3:
             return False
         
-        # Separate wilds from non-wilds
-        non_wilds = [c for c in cards if not MeldValidator.is_wild(c, wild_rank)]
+        # Fast path for the most common candidate: three cards, no wilds
+        if len(cards) == 3:
+            a, b, c = cards[0].code, cards[1].code, cards[2].code
+            ra, rb, rc = a & RANK_MASK, b & RANK_MASK, c & RANK_MASK
+            if (ra != wild_idx and ra != JOKER_INDEX and rb != wild_idx and rb != JOKER_INDEX
+                    and rc != wild_idx and rc != JOKER_INDEX):
+                if not (a & SUIT_MASK) == (b & SUIT_MASK) == (c & SUIT_MASK):
+                    return False
+                lo, mid, hi = sorted((ra, rb, rc))
+                return mid == lo + 1 and hi == mid + 1
         
-        if not non_wilds:
-            return False  # Can't be all wilds
+        sig = tuple(sorted(c.code for c in cards))
+        return _cached_is_valid_run(sig, wild_idx)
+    
+    @staticmethod
+    def is_valid_sig(sig: Tuple[int, ...], wild_idx: int) -> bool:
+        """Book or run check on a sorted tuple of card codes, for callers that work on codes"""
+        return _cached_is_valid_book(sig, wild_idx) or _cached_is_valid_run(sig, wild_idx)
+
+
+# Validation results depend only on the multiset of cards, so the validators
+# below are memoized on the sorted tuple of card codes plus the wild rank
+# index. They work purely on ints: no Card objects, strings, or dict lookups.
+# The int annotations on locals let Cython/mypyc type them (see setup.py).
+@lru_cache(maxsize=8192)
+def _cached_is_valid_book(sig: Tuple[int, ...], wild_idx: int) -> bool:
+    """Book check over a sorted code signature (see MeldValidator.is_valid_book)"""
+    # Single pass: non-wilds must share one rank and never repeat a suit
+    target_rank: int = -1
+    suits_seen: int = 0
+    for code in sig:
+        rank = code & RANK_MASK
+        if rank == wild_idx or rank == JOKER_INDEX:
+            continue  # Wilds can be any rank and suit
+        if target_rank < 0:
+            target_rank = rank
+        elif rank != target_rank:
+            return False  # All non-wilds must be same rank
+        suit_bit = code & SUIT_MASK
+        if suits_seen & suit_bit:
+            return False  # Duplicate suit
+        suits_seen |= suit_bit
+    
+    # Can't be all wilds - need at least one real card
+    return target_rank >= 0
+
+
+@lru_cache(maxsize=8192)
+def _cached_is_valid_run(sig: Tuple[int, ...], wild_idx: int) -> bool:
+    """Run check over a sorted code signature (see MeldValidator.is_valid_run)"""
+    # Single pass: set one bit per non-wild rank, rejecting mixed suits and
+    # duplicate ranks early
+    rank_mask: int = 0
+    all_rank_bits: int = 0  # Ranks of every card, wild or not, for the boundary rules
+    non_wild_count: int = 0
+    target_suit: int = 0
+    for code in sig:
+        rank = code & RANK_MASK
+        all_rank_bits |= 1 << rank
+        if rank == wild_idx or rank == JOKER_INDEX:
+            continue
+        suit_bit = code & SUIT_MASK
+        if not target_suit:
+            target_suit = suit_bit
+        elif suit_bit != target_suit:
+            return False  # All non-wilds must be same suit
+        rank_bit = 1 << rank
+        if rank_mask & rank_bit:
+            return False  # Can't have duplicate ranks in a run
+        rank_mask |= rank_bit
+        non_wild_count += 1
+    
+    if not non_wild_count:
+        return False  # Can't be all wilds
+    
+    wild_count: int = len(sig) - non_wild_count
+    
+    # Lowest and highest non-wild ranks come straight from the mask
+    lowest_rank_value: int = (rank_mask & -rank_mask).bit_length() - 1
+    highest_rank_value: int = rank_mask.bit_length() - 1
+    
+    # Calculate the minimum sequence span (from lowest to highest non-wild card)
+    min_span: int = highest_rank_value - lowest_rank_value + 1
+    
+    # Every empty slot inside the span must be filled by a wild
+    wilds_needed_for_gaps: int = min_span - non_wild_count
+    
+    # Check if we have enough wilds to fill all gaps
+    if wilds_needed_for_gaps > wild_count:
+        return False
+    
+    # Remaining wilds can extend either end of the sequence
+    remaining_wilds: int = wild_count - wilds_needed_for_gaps
+    
+    # Total cards should equal min_span plus any wilds extending the ends
+    expected_length = min_span + remaining_wilds
+    
+    if len(sig) != expected_length:
+        return False
+    
+    # Check that we're not extending beyond valid ranks (3-K range)
+    # We can't extend below rank 0 (which is '3') or above rank 10 (which is 'K')
+    # Check if sequence is at boundaries (considering both wild and non-wild cards)
+    has_rank_k = bool(all_rank_bits & (1 << 10))
+    # Check if we have a 3 that's being used (either as non-wild or as wild representing 3)
+    has_rank_3_as_start = False
+    if lowest_rank_value == 0:  # Non-wild 3 is the lowest
+        has_rank_3_as_start = True
+    elif wild_idx == 0:  # 3s are wild this round
+        # Check if we have a wild 3 that would be at the start of the sequence
+        # This is tricky - we need to see if a wild 3 is being used at position 0
+        # For simplicity, if we have any 3 in cards and it's wild, and lowest non-wild is 4,
+        # then the sequence effectively starts at 3
+        if all_rank_bits & 1 and lowest_rank_value == 1:  # 4 is at position 1
+            has_rank_3_as_start = True
+    
+    # If we have remaining wilds, check if they can be placed within bounds
+    if remaining_wilds > 0:
+        # Calculate how many wilds can be placed at each end
+        # Can't extend below position 0 (rank '3')
+        max_wilds_at_start = lowest_rank_value
+        # Can't extend above position 10 (rank 'K')
+        max_wilds_at_end = 10 - highest_rank_value
         
-        # All non-wilds must be same suit
-        target_suit = non_wilds[0].suit
-        if not all(c.suit == target_suit for c in non_wilds):
+        # Stricter rule: if sequence is at a boundary, we can't add wilds at all
+        # This prevents extending sequences that are already at the limits
+        if has_rank_k and highest_rank_value == 10:  # Sequence ends at K
+            # Can't add wilds - would extend beyond K
             return False
-        
-        # Check if sequence is possible with wilds filling gaps
-        sorted_cards = sorted(non_wilds, key=lambda c: MeldValidator.RANK_VALUES[c.rank])
-        wild_count = len(cards) - len(non_wilds)
-        
-        # Check for duplicate ranks in non-wilds
-        ranks_seen = set()
-        for card in sorted_cards:
-            if card.rank in ranks_seen:
-                return False  # Can't have duplicate ranks in a run
-            ranks_seen.add(card.rank)
-        
-        # Calculate minimum wilds needed to fill gaps between non-wild cards
-        wilds_needed_for_gaps = 0
-        for i in range(len(sorted_cards) - 1):
-            gap = MeldValidator.RANK_VALUES[sorted_cards[i+1].rank] - MeldValidator.RANK_VALUES[sorted_cards[i].rank] - 1
-            wilds_needed_for_gaps += gap
-        
-        # Check if we have enough wilds to fill all gaps
-        if wilds_needed_for_gaps > wild_count:
+        if has_rank_3_as_start:  # Sequence effectively starts at 3
+            # Can't add wilds - would extend below 3
             return False
         
-        # Remaining wilds can extend either end of the sequence
-        remaining_wilds = wild_count - wilds_needed_for_gaps
-        
-        # Calculate the minimum sequence span (from lowest to highest non-wild card)
-        min_span = MeldValidator.RANK_VALUES[sorted_cards[-1].rank] - MeldValidator.RANK_VALUES[sorted_cards[0].rank] + 1
-        
-        # Total cards should equal min_span plus any wilds extending the ends
-        expected_length = min_span + remaining_wilds
-        
-        if len(cards) != expected_length:
+        # For sequences not at boundaries, check if we can place all remaining wilds
+        if remaining_wilds > max_wilds_at_start + max_wilds_at_end:
             return False
-        
-        # Check that we're not extending beyond valid ranks (3-K range)
-        # Lowest possible rank if wilds extend downward
-        lowest_rank_value = MeldValidator.RANK_VALUES[sorted_cards[0].rank]
-        # Highest possible rank if wilds extend upward
-        highest_rank_value = MeldValidator.RANK_VALUES[sorted_cards[-1].rank]
-        
-        # We can't extend below rank 0 (which is '3') or above rank 10 (which is 'K')
-        # Check if sequence is at boundaries (considering both wild and non-wild cards)
-        has_rank_k = any(c.rank == 'K' for c in cards)
-        # Check if we have a 3 that's being used (either as non-wild or as wild representing 3)
-        has_rank_3_as_start = False
-        if lowest_rank_value == 0:  # Non-wild 3 is the lowest
-            has_rank_3_as_start = True
-        elif wild_rank == '3':  # 3s are wild this round
-            # Check if we have a wild 3 that would be at the start of the sequence
-            # This is tricky - we need to see if a wild 3 is being used at position 0
-            # For simplicity, if we have any 3 in cards and it's wild, and lowest non-wild is 4,
-            # then the sequence effectively starts at 3
-            if any(c.rank == '3' for c in cards) and lowest_rank_value == 1:  # 4 is at position 1
-                has_rank_3_as_start = True
-        
-        # If we have remaining wilds, check if they can be placed within bounds
-        if remaining_wilds > 0:
-            # Calculate how many wilds can be placed at each end
-            # Can't extend below position 0 (rank '3')
-            max_wilds_at_start = lowest_rank_value
-            # Can't extend above position 10 (rank 'K')
-            max_wilds_at_end = 10 - highest_rank_value
-            
-            # Stricter rule: if sequence is at a boundary, we can't add wilds at all
-            # This prevents extending sequences that are already at the limits
-            if has_rank_k and highest_rank_value == 10:  # Sequence ends at K
-                # Can't add wilds - would extend beyond K
-                return False
-            if has_rank_3_as_start:  # Sequence effectively starts at 3
-                # Can't add wilds - would extend below 3
-                return False
-            
-            # For sequences not at boundaries, check if we can place all remaining wilds
-            if remaining_wilds > max_wilds_at_start + max_wilds_at_end:
-                return False
-        
-        return True
+    
+    return True
+
+
+# Cards are immutable, so one shared instance per (rank, suit) serves every
+# copy in the deck and every create_card() call
+_CARD_POOL = {}
+
+
+def pooled_card(rank: str, suit: Suit) -> Card:
+    """The shared Card instance for a rank and suit"""
+    card = _CARD_POOL.get((rank, suit))
+    if card is None:
+        card = _CARD_POOL[(rank, suit)] = Card(rank, suit)
+    return card
+
+
+_SUIT_LETTERS = {
+    'S': Suit.SPADES,
+    'H': Suit.HEARTS,
+    'C': Suit.CLUBS,
+    'D': Suit.DIAMONDS,
+    'T': Suit.STARS,
+    'J': Suit.JOKER  # For jokers, though create_joker() is preferred
+}
 
 
 def create_card(rank: str, suit: str) -> Card:
     """Helper to create cards more easily"""
-    suit_map = {
-        'S': Suit.SPADES,
-        'H': Suit.HEARTS,
-        'C': Suit.CLUBS,
-        'D': Suit.DIAMONDS,
-        'T': Suit.STARS,
-        'J': Suit.JOKER  # For jokers, though create_joker() is preferred
-    }
-    return Card(rank, suit_map[suit])
+    return pooled_card(rank, _SUIT_LETTERS[suit])
+
+
+# Every Joker is this one instance, so callers may test `card is JOKER`
+JOKER = pooled_card('Joker', Suit.JOKER)
 
 
 def create_joker() -> Card:
     """Helper to create a joker card (always wild)"""
-    return Card('Joker', Suit.JOKER)
+    return JOKER
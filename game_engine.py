@@ -3,9 +3,24 @@ Five Crowns Game Engine - Deck, Game State, and Turn Management
 """
 
 import random
+from collections import Counter
 from dataclasses import dataclass, field
-from typing import List, Optional, Set, Tuple
-from five_crowns import Card, Suit, MeldValidator, create_card, create_joker
+from typing import List, Optional, Tuple
+from five_crowns import (
+    Card, Suit, MeldValidator, create_card, create_joker, pooled_card,
+    RANK_MASK, round_points,
+)
+from meld_finder import MeldFinder
+
+# Suit order used when sorting a hand for display
+_SUIT_ORDER = {
+    Suit.SPADES: 0,
+    Suit.HEARTS: 1,
+    Suit.CLUBS: 2,
+    Suit.DIAMONDS: 3,
+    Suit.STARS: 4,
+    Suit.JOKER: 5
+}
 
 
 class Deck:
@@ -14,15 +29,22 @@ class Deck:
     def __init__(self):
         self.cards: List[Card] = []
         self.discard_pile: List[Card] = []
+        self._discard_top: Optional[Card] = None  # Kept equal to discard_pile[-1]
         self._initialize_deck()
 
     def _initialize_deck(self):
+        """Fill the deck with a fresh copy of the full card list (see _build_template)"""
+        self.cards = list(Deck._TEMPLATE)
+
+    @staticmethod
+    def _build_template() -> List[Card]:
         """
-        Initialize a Five Crowns deck:
+        Build the cards of a Five Crowns deck:
         - 2 copies of each card (ranks 3-K in 5 suits) = 2 * 11 * 5 = 110 cards
         - 6 jokers
         Total: 116 cards
         """
+        cards = []
         ranks = ['3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K']
         suits = [Suit.SPADES, Suit.HEARTS, Suit.CLUBS, Suit.DIAMONDS, Suit.STARS]
 
@@ -30,11 +52,12 @@ class Deck:
         for _ in range(2):
             for rank in ranks:
                 for suit in suits:
-                    self.cards.append(Card(rank, suit))
+                    cards.append(pooled_card(rank, suit))
 
         # Add 6 jokers
         for _ in range(6):
-            self.cards.append(create_joker())
+            cards.append(create_joker())
+        return cards
 
     def shuffle(self):
         """Shuffle the deck"""
@@ -45,9 +68,11 @@ class Deck:
         if len(self.cards) < num_cards:
             raise ValueError(f"Not enough cards in deck: {len(self.cards)} < {num_cards}")
 
-        dealt_cards = []
-        for _ in range(num_cards):
-            dealt_cards.append(self.cards.pop())
+        # Take the top cards in one slice; reversed to match popping them one at a time
+        split = len(self.cards) - num_cards
+        dealt_cards = self.cards[split:]
+        del self.cards[split:]
+        dealt_cards.reverse()
         return dealt_cards
 
     def draw(self) -> Card:
@@ -59,22 +84,30 @@ class Deck:
     def add_to_discard(self, card: Card):
         """Add a card to the discard pile"""
         self.discard_pile.append(card)
+        self._discard_top = card
 
     def draw_from_discard(self) -> Card:
         """Draw the top card from the discard pile"""
         if not self.discard_pile:
             raise ValueError("Discard pile is empty")
-        return self.discard_pile.pop()
+        card = self.discard_pile.pop()
+        self._discard_top = self.discard_pile[-1] if self.discard_pile else None
+        return card
 
     def peek_discard(self) -> Optional[Card]:
         """Look at the top card of the discard pile without removing it"""
-        return self.discard_pile[-1] if self.discard_pile else None
+        return self._discard_top
 
     def cards_remaining(self) -> int:
         """Return number of cards left in deck"""
         return len(self.cards)
 
 
+# Cards are immutable, so every new Deck shares these pooled cards instead of
+# constructing its own; both copies of a card are the same object.
+Deck._TEMPLATE = Deck._build_template()
+
+
 @dataclass
 class Player:
     """Represents a player in the game"""
@@ -82,14 +115,33 @@ class Player:
     hand: List[Card] = field(default_factory=list)
     score: int = 0
     is_human: bool = True
+    # The hand list as of the last sort_hand, while it's still in order.
+    # Removing cards keeps a sorted hand sorted; adding one or assigning a
+    # new hand list does not, and sort_hand then sorts again.
+    _sorted_hand: Optional[List[Card]] = field(default=None, init=False, repr=False, compare=False)
 
     def add_card(self, card: Card):
         """Add a card to the player's hand"""
         self.hand.append(card)
+        self._sorted_hand = None
 
-    def remove_card(self, card: Card):
-        """Remove a card from the player's hand"""
-        self.hand.remove(card)
+    def remove_card(self, card: Card, index: Optional[int] = None):
+        """
+        Remove a card from the player's hand.
+        Pass index when the caller already knows the card's position.
+        """
+        hand = self.hand
+        if index is None:
+            # Identity is a pointer compare; cards from the deck are pooled,
+            # so this finds the card without calling __eq__ on the hand
+            for i, held in enumerate(hand):
+                if held is card:
+                    index = i
+                    break
+            else:
+                hand.remove(card)  # Equal card that isn't the pooled object
+                return
+        hand.pop(index)
 
     def calculate_hand_value(self, wild_rank: str) -> int:
         """
@@ -98,31 +150,21 @@ class Player:
         - J, Q, K: 10 points each
         - Wilds and Jokers: 20 points each
         """
-        total = 0
-        for card in self.hand:
-            if MeldValidator.is_wild(card, wild_rank):
-                total += 20
-            elif card.rank in ['J', 'Q', 'K']:
-                total += 10
-            else:
-                total += int(card.rank)
-        return total
+        points = round_points(wild_rank)
+        return sum(points[card.code & RANK_MASK] for card in self.hand)
 
     def sort_hand(self):
-        """Sort hand by suit then rank for easier viewing"""
-        suit_order = {
-            Suit.SPADES: 0,
-            Suit.HEARTS: 1,
-            Suit.CLUBS: 2,
-            Suit.DIAMONDS: 3,
-            Suit.STARS: 4,
-            Suit.JOKER: 5
-        }
-
-        self.hand.sort(key=lambda c: (
-            suit_order.get(c.suit, 99),
-            MeldValidator.RANK_VALUES.get(c.rank, -1)
-        ))
+        """Sort hand by suit then rank for easier viewing (no-op if already sorted)"""
+        hand = self.hand
+        if self._sorted_hand is hand:
+            return
+        # Decorate with plain tuples so the sort compares in C; the position
+        # keeps equal cards in their current order, as a stable sort would.
+        # The rank comes from the card code, not a lookup on the rank string
+        keys = [(_SUIT_ORDER[c.suit], c.code & RANK_MASK, i) for i, c in enumerate(hand)]
+        keys.sort()
+        hand[:] = [hand[k[2]] for k in keys]
+        self._sorted_hand = hand
 
 
 @dataclass
@@ -219,12 +261,13 @@ class GameEngine:
         self.state.current_player().add_card(card)
         return card
 
-    def discard_card(self, card: Card):
+    def discard_card(self, card: Card, index: Optional[int] = None):
         """
         Discard a card from current player's hand.
+        index is the card's position in the hand, if the caller knows it.
         """
         player = self.state.current_player()
-        player.remove_card(card)
+        player.remove_card(card, index)
         self.state.deck.add_to_discard(card)
 
     def try_go_out(self, melds: List[List[Card]]) -> Tuple[bool, Optional[str]]:
@@ -240,14 +283,11 @@ class GameEngine:
         if cards_in_melds != len(player.hand):
             return False, f"Melds use {cards_in_melds} cards but hand has {len(player.hand)}"
 
-        # Check that all cards in melds are from player's hand
-        meld_cards = set()
-        for meld in melds:
-            for card in meld:
-                meld_cards.add(card)
-
-        hand_cards = set(player.hand)
-        if meld_cards != hand_cards:
+        # Check that the melds use exactly the cards in hand. Compare bags of
+        # card codes, not sets: a hand can hold both copies of a card, and a
+        # set would let a meld reuse a card held only once
+        meld_cards = Counter(card.code for meld in melds for card in meld)
+        if meld_cards != Counter(card.code for card in player.hand):
             return False, "Melds contain cards not in hand"
 
         # Validate the melds
@@ -267,8 +307,9 @@ class GameEngine:
         Note: Scores are calculated in announce_round_end() after players arrange melds.
         This just increments the round number.
         """
-        # Move to next round
+        # Move to next round; cached go-out searches are for the old wild rank
         self.state.round_number += 1
+        MeldFinder.clear_cache()
 
     def get_winner(self) -> Optional[Player]:
         """Get the winner (lowest score) after all rounds complete"""
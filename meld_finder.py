@@ -2,14 +2,36 @@
 Meld Finder - Discovers all valid melds and optimal meld combinations
 """
 
-from typing import List, Set, Tuple, Optional, FrozenSet
+from typing import Dict, List, Tuple, Optional
 from itertools import combinations
-from five_crowns import Card, Suit, MeldValidator
+from functools import lru_cache
+from operator import attrgetter
+from five_crowns import (
+    Card, MeldValidator, RANK_INDEX, SUIT_BITS, RANK_MASK, SUIT_MASK, JOKER_INDEX,
+    RANK_POINTS, WILD_POINTS, pooled_card,
+)
+
+# Inverse of the card encoding, for rebuilding cards from a cached signature
+_RANK_BY_INDEX = {i: rank for rank, i in RANK_INDEX.items()}
+_SUIT_BY_BIT = {bit: suit for suit, bit in SUIT_BITS.items()}
 
 
 class MeldFinder:
     """Finds all possible valid melds in a hand"""
 
+    @staticmethod
+    def _encode_hand(hand: List[Card], wild_idx: int) -> Tuple[List[int], List[bool], List[int]]:
+        """
+        Per-card code, wild flag and point value, in hand order.
+        Computed once per search so inner loops index lists instead of
+        re-deriving them from rank strings.
+        """
+        codes = [card.code for card in hand]
+        is_wild = [MeldValidator.is_wild_code(code, wild_idx) for code in codes]
+        points = [WILD_POINTS if wild else RANK_POINTS[code & RANK_MASK]
+                  for code, wild in zip(codes, is_wild)]
+        return codes, is_wild, points
+
     @staticmethod
     def find_all_books(hand: List[Card], wild_rank: str) -> List[List[Card]]:
         """
@@ -18,44 +40,28 @@ class MeldFinder:
         """
         books = []
 
-        # Group cards by rank
+        # Group cards by rank, keeping one card per suit: a second copy of a
+        # card only repeats a book, and a book can't use the same suit twice
         rank_groups = {}
         wilds = []
+        wild_idx = MeldValidator.wild_index(wild_rank)
+        is_wild_code = MeldValidator.is_wild_code
 
         for card in hand:
-            if MeldValidator.is_wild(card, wild_rank):
+            if is_wild_code(card.code, wild_idx):
                 wilds.append(card)
             else:
-                if card.rank not in rank_groups:
-                    rank_groups[card.rank] = []
-                rank_groups[card.rank].append(card)
-
-        # For each rank, try to form books using different combinations
-        for rank, cards_of_rank in rank_groups.items():
-            # Try all combinations of this rank (3+) with various numbers of wilds
-            for num_cards in range(3, len(cards_of_rank) + 1):
+                rank_groups.setdefault(card.rank, {}).setdefault(card.suit, card)
+
+        # Any subset of distinct-suit cards of one rank is a valid book once
+        # wilds bring it to 3+ cards. Wilds are interchangeable in a book, so
+        # only the number used matters and the first num_wilds stand in for all
+        for rank, cards_by_suit in rank_groups.items():
+            cards_of_rank = list(cards_by_suit.values())
+            for num_cards in range(1, len(cards_of_rank) + 1):
                 for combo in combinations(cards_of_rank, num_cards):
-                    book = list(combo)
-                    if MeldValidator.is_valid_book(book, wild_rank):
-                        books.append(book)
-
-                    # Try adding wilds to this combination
-                    for num_wilds in range(1, len(wilds) + 1):
-                        if len(book) + num_wilds < 3:
-                            continue
-                        for wild_combo in combinations(wilds, num_wilds):
-                            book_with_wilds = book + list(wild_combo)
-                            if MeldValidator.is_valid_book(book_with_wilds, wild_rank):
-                                books.append(book_with_wilds)
-
-        # Also try books that are mostly wilds (with at least one real card)
-        for rank, cards_of_rank in rank_groups.items():
-            for card in cards_of_rank[:1]:  # Just need one card of this rank
-                for num_wilds in range(2, len(wilds) + 1):
-                    for wild_combo in combinations(wilds, num_wilds):
-                        book = [card] + list(wild_combo)
-                        if MeldValidator.is_valid_book(book, wild_rank):
-                            books.append(book)
+                    for num_wilds in range(max(0, 3 - num_cards), len(wilds) + 1):
+                        books.append(list(combo) + wilds[:num_wilds])
 
         return books
 
@@ -67,48 +73,49 @@ class MeldFinder:
         """
         runs = []
 
-        # Group cards by suit
+        # Group cards by suit, keeping one card per rank: a run can't repeat a
+        # rank, and a second copy of a card would only repeat the same runs
         suit_groups = {}
         wilds = []
+        wild_idx = MeldValidator.wild_index(wild_rank)
+        is_wild_code = MeldValidator.is_wild_code
 
         for card in hand:
-            if MeldValidator.is_wild(card, wild_rank):
+            if is_wild_code(card.code, wild_idx):
                 wilds.append(card)
             else:
-                if card.suit not in suit_groups:
-                    suit_groups[card.suit] = []
-                suit_groups[card.suit].append(card)
-
-        # For each suit, try to form runs
-        for suit, cards_of_suit in suit_groups.items():
-            # Sort by rank
-            sorted_cards = sorted(cards_of_suit, key=lambda c: MeldValidator.RANK_VALUES[c.rank])
-
-            # Try all combinations of cards from this suit
-            for combo_size in range(3, len(sorted_cards) + 1):
-                for combo in combinations(sorted_cards, combo_size):
-                    run = list(combo)
-
-                    # Try without wilds
-                    if MeldValidator.is_valid_run(run, wild_rank):
-                        runs.append(run)
-
-                    # Try with different numbers of wilds
-                    for num_wilds in range(1, len(wilds) + 1):
-                        for wild_combo in combinations(wilds, num_wilds):
-                            run_with_wilds = run + list(wild_combo)
-                            if MeldValidator.is_valid_run(run_with_wilds, wild_rank):
-                                runs.append(run_with_wilds)
-
-        # Also try runs that are mostly wilds (with at least one real card)
-        for suit, cards_of_suit in suit_groups.items():
-            for combo_size in range(1, min(3, len(cards_of_suit) + 1)):
-                for combo in combinations(cards_of_suit, combo_size):
-                    for num_wilds in range(3 - combo_size, len(wilds) + 1):
-                        for wild_combo in combinations(wilds, num_wilds):
-                            run = list(combo) + list(wild_combo)
-                            if len(run) >= 3 and MeldValidator.is_valid_run(run, wild_rank):
-                                runs.append(run)
+                suit_groups.setdefault(card.suit, {}).setdefault(card.rank, card)
+
+        # Only the number of wilds matters, so the first num_wilds stand in
+        # for every choice. Jokers go first: with 3s wild, the run boundary
+        # rule can reject a wild 3 where a Joker is fine, never the reverse
+        wilds.sort(key=lambda c: c.code & RANK_MASK != JOKER_INDEX)
+
+        # Sort each suit by rank once; within one suit the card code orders
+        # by rank, and attrgetter keeps the key in C
+        by_code = attrgetter('code')
+        suit_groups = {suit: sorted(cards_by_rank.values(), key=by_code)
+                       for suit, cards_by_rank in suit_groups.items()}
+
+        # For each suit, grow runs left to right over the rank-sorted cards.
+        # The wilds needed to fill gaps between real cards only grow as the run
+        # extends, so a run stops growing once they exceed the wilds in hand;
+        # with no wilds this leaves just windows of consecutive ranks
+        def extend(run, cards, ranks, last, gaps):
+            for num_wilds in range(max(gaps, 3 - len(run)), len(wilds) + 1):
+                run_with_wilds = run + wilds[:num_wilds]
+                if MeldValidator.is_valid_run_idx(run_with_wilds, wild_idx):
+                    runs.append(run_with_wilds)
+            for j in range(last + 1, len(ranks)):
+                new_gaps = gaps + ranks[j] - ranks[last] - 1
+                if new_gaps > len(wilds):
+                    break  # Ranks ascend, so later cards leave wider gaps
+                extend(run + [cards[j]], cards, ranks, j, new_gaps)
+
+        for suit, sorted_cards in suit_groups.items():
+            ranks = [card.code & RANK_MASK for card in sorted_cards]
+            for start in range(len(sorted_cards)):
+                extend([sorted_cards[start]], sorted_cards, ranks, start, 0)
 
         return runs
 
@@ -119,169 +126,101 @@ class MeldFinder:
         runs = MeldFinder.find_all_runs(hand, wild_rank)
         return books + runs
 
-    @staticmethod
-    def _cards_to_frozenset(cards: List[Card]) -> FrozenSet[Tuple]:
-        """Convert list of cards to hashable frozenset for deduplication"""
-        return frozenset((c.rank, c.suit) for c in cards)
-
     @staticmethod
     def find_best_meld_combination(hand: List[Card], wild_rank: str) -> Tuple[List[List[Card]], int]:
         """
         Find the best combination of non-overlapping melds that minimizes remaining cards.
         Returns (list_of_melds, remaining_points)
 
-        Uses greedy algorithm:
-        1. Find all possible melds
-        2. Try combinations that don't overlap
-        3. Return combination that leaves minimum points
+        Results are memoized on the hand's sorted card codes and the wild rank,
+        and the melds are made of the caller's own card objects.
         """
         if not hand:
             return [], 0
 
-        all_melds = MeldFinder.find_all_melds(hand, wild_rank)
-
-        # Remove duplicate melds
-        unique_melds = []
-        seen = set()
-        for meld in all_melds:
-            meld_set = MeldFinder._cards_to_frozenset(meld)
-            if meld_set not in seen:
-                seen.add(meld_set)
-                unique_melds.append(meld)
-
-        # Try to find best combination of non-overlapping melds
-        best_melds = []
-        best_remaining_points = MeldFinder._calculate_hand_value(hand, wild_rank)
-
-        # Use backtracking to find best combination
-        MeldFinder._find_best_combination_recursive(
-            hand, unique_melds, wild_rank, [], 0, best_remaining_points,
-            lambda melds, points: (
-                setattr(locals(), 'best_melds', melds),
-                setattr(locals(), 'best_remaining_points', points)
-            )
-        )
-
-        # Simpler greedy approach: try each meld as starting point
-        for i, start_meld in enumerate(unique_melds):
-            result = MeldFinder._greedy_meld_selection(hand, unique_melds, wild_rank, [start_meld])
-            remaining_points = MeldFinder._calculate_remaining_points(hand, result, wild_rank)
+        sig = tuple(sorted(card.code for card in hand))
+        meld_codes, remaining_points = _cached_find_best(sig, wild_rank)
+        return MeldFinder._melds_from_codes(hand, meld_codes), remaining_points
 
-            if remaining_points < best_remaining_points:
-                best_remaining_points = remaining_points
-                best_melds = result
-
-        # Also try without any starting meld
-        result = MeldFinder._greedy_meld_selection(hand, unique_melds, wild_rank, [])
-        remaining_points = MeldFinder._calculate_remaining_points(hand, result, wild_rank)
-
-        if remaining_points < best_remaining_points:
-            best_remaining_points = remaining_points
-            best_melds = result
-
-        return best_melds, best_remaining_points
+    @staticmethod
+    def _melds_from_codes(hand: List[Card], meld_codes: Tuple[Tuple[int, ...], ...]) -> List[List[Card]]:
+        """Put the hand's card objects into melds given as codes (copies are interchangeable)"""
+        by_code = {}
+        for card in hand:
+            by_code.setdefault(card.code, []).append(card)
+        return [[by_code[code].pop() for code in meld] for meld in meld_codes]
 
     @staticmethod
-    def _greedy_meld_selection(hand: List[Card], all_melds: List[List[Card]],
-                               wild_rank: str, current_melds: List[List[Card]]) -> List[List[Card]]:
+    def _solve_best_combination(hand: List[Card], wild_rank: str,
+                                go_out_only: bool = False) -> Tuple[List[List[Card]], int]:
         """
-        Greedy algorithm to select melds.
-        Repeatedly adds the meld that reduces remaining points the most.
+        Uncached search behind find_best_meld_combination.
+        With go_out_only, only covers of the whole hand are searched, and a
+        hand that can't go out returns no melds and its full point value.
+
+        Exact search (dynamic programming over bitmasks of remaining cards):
+        1. Find all possible melds and reduce them to distinct meld types
+        2. The lowest remaining card is either left over or used by a meld type
+           that contains it; solve the rest of the hand the same way
+        3. Return the combination that covers the most points
         """
-        used_cards = set()
-        for meld in current_melds:
-            for card in meld:
-                used_cards.add(id(card))
-
-        result = current_melds.copy()
-
-        while True:
-            best_meld = None
-            best_points_saved = 0
-
-            for meld in all_melds:
-                # Check if meld overlaps with used cards
-                if any(id(card) in used_cards for card in meld):
-                    continue
-
-                # Calculate points saved by this meld
-                points_saved = sum(
-                    MeldFinder._card_value(card, wild_rank) for card in meld
-                )
-
-                if points_saved > best_points_saved:
-                    best_points_saved = points_saved
-                    best_meld = meld
-
-            if best_meld is None:
-                break
-
-            # Add this meld
-            result.append(best_meld)
-            for card in best_meld:
-                used_cards.add(id(card))
+        if not hand:
+            return [], 0
 
-        return result
+        wild_idx = MeldValidator.wild_index(wild_rank)
+        codes, is_wild, points = MeldFinder._encode_hand(hand, wild_idx)
+
+        # Canonical order: identical cards are adjacent and wilds come last
+        # (Jokers, then wild-rank cards), so a meld always takes the lowest
+        # remaining copies
+        order = sorted(range(len(hand)), key=lambda i: (
+            is_wild[i], is_wild[i] and codes[i] & RANK_MASK != JOKER_INDEX, codes[i]
+        ))
+        cards = [hand[i] for i in order]
+        n = len(cards)
+
+        positions = {}  # Non-wild code -> positions of its copies
+        wild_positions = []
+        for pos, i in enumerate(order):
+            if is_wild[i]:
+                wild_positions.append(pos)
+            else:
+                positions.setdefault(codes[i], []).append(pos)
 
-    @staticmethod
-    def _find_best_combination_recursive(hand: List[Card], all_melds: List[List[Card]],
-                                        wild_rank: str, current_melds: List[List[Card]],
-                                        start_idx: int, best_score: int,
-                                        update_best) -> int:
-        """Recursive helper for finding best meld combination (with pruning)"""
-        # Calculate current score
-        current_score = MeldFinder._calculate_remaining_points(hand, current_melds, wild_rank)
-
-        if current_score < best_score:
-            best_score = current_score
-            # Update best found (this is a simplified approach)
-
-        # If we've used all cards, we're done
-        if current_score == 0:
-            return 0
-
-        # Try adding more melds
-        used_cards = set(id(card) for meld in current_melds for card in meld)
-
-        for i in range(start_idx, len(all_melds)):
-            meld = all_melds[i]
-
-            # Skip if meld overlaps with used cards
-            if any(id(card) in used_cards for card in meld):
+        # A meld type is its non-wild codes plus a wild count: copies of a
+        # card, and wilds, are interchangeable when placing it
+        types_by_code = {}
+        seen = set()
+        for meld in MeldFinder.find_all_melds(hand, wild_rank):
+            real = tuple(sorted(c.code for c in meld if c.code in positions))  # positions has only non-wilds
+            key = (real, len(meld) - len(real))
+            if key in seen:
                 continue
+            seen.add(key)
+            value = sum(RANK_POINTS[code & RANK_MASK] for code in real) + WILD_POINTS * key[1]
+            for code in set(real):
+                types_by_code.setdefault(code, []).append((real, key[1], value))
+
+        pos_codes = [codes[i] for i in order]
+        pos_points = [points[i] for i in order]
+        full = (1 << n) - 1
+        covered, choice = _solve_cover(pos_codes, pos_points, positions, wild_positions,
+                                       types_by_code, wild_idx, go_out_only)
+        if covered < 0:
+            return [], sum(points)
+
+        # Walk the recorded choices to rebuild the melds
+        best_melds = []
+        mask = full
+        while mask:
+            used = choice[mask]
+            if used:
+                best_melds.append([cards[i] for i in range(n) if used >> i & 1])
+                mask ^= used
+            else:
+                mask ^= mask & -mask
 
-            # Recursively try with this meld added
-            new_melds = current_melds + [meld]
-            MeldFinder._find_best_combination_recursive(
-                hand, all_melds, wild_rank, new_melds, i + 1, best_score, update_best
-            )
-
-        return best_score
-
-    @staticmethod
-    def _calculate_remaining_points(hand: List[Card], melds: List[List[Card]], wild_rank: str) -> int:
-        """Calculate points from cards not in any meld"""
-        used_cards = set(id(card) for meld in melds for card in meld)
-        remaining = [card for card in hand if id(card) not in used_cards]
-        return MeldFinder._calculate_hand_value(remaining, wild_rank)
-
-    @staticmethod
-    def _calculate_hand_value(cards: List[Card], wild_rank: str) -> int:
-        """Calculate point value of cards"""
-        total = 0
-        for card in cards:
-            total += MeldFinder._card_value(card, wild_rank)
-        return total
-
-    @staticmethod
-    def _card_value(card: Card, wild_rank: str) -> int:
-        """Get point value of a single card"""
-        if MeldValidator.is_wild(card, wild_rank):
-            return 20
-        elif card.rank in ['J', 'Q', 'K']:
-            return 10
-        else:
-            return int(card.rank)
+        return best_melds, sum(points) - covered
 
     @staticmethod
     def can_go_out(hand: List[Card], wild_rank: str) -> Tuple[bool, Optional[List[List[Card]]]]:
@@ -289,8 +228,141 @@ class MeldFinder:
         Check if the hand can go out (all cards in valid melds).
         Returns (can_go_out, melds_or_none)
         """
-        melds, remaining_points = MeldFinder.find_best_meld_combination(hand, wild_rank)
+        if not hand:
+            return True, []
+
+        # Only a full cover matters here, so search for one directly: no
+        # leave-a-card branches, and stop at the first cover found
+        sig = tuple(sorted(card.code for card in hand))
+        meld_codes = _cached_go_out(sig, wild_rank)
+        if meld_codes is None:
+            return False, None
+        return True, MeldFinder._melds_from_codes(hand, meld_codes)
+
+    @staticmethod
+    def clear_cache():
+        """Drop memoized meld searches (called when a round ends)"""
+        _cached_find_best.cache_clear()
+        _cached_go_out.cache_clear()
+
+
+def _solve_cover(pos_codes: List[int], pos_points: List[int], positions: Dict[int, List[int]],
+                 wild_positions: List[int],
+                 types_by_code: Dict[int, List[Tuple[Tuple[int, ...], int, int]]],
+                 wild_idx: int, go_out_only: bool = False) -> Tuple[int, List[int]]:
+    """
+    Exact meld-cover DP over bitmasks of canonical hand positions, on ints only.
+
+    pos_codes and pos_points hold the card code and point value at each
+    position (non-wilds first, wilds last), positions maps a non-wild code to
+    the positions of its copies, and types_by_code maps a code to the meld
+    types (non-wild codes, wild count, points) containing it. Returns the most
+    points coverable from the full hand, and choice[mask]: the cards of the
+    meld taken with the lowest card of mask, or 0 to leave that card out.
+
+    With go_out_only, no card may be left out: the result is the hand's total
+    if every card can be melded and -1 otherwise.
+    """
+    n = len(pos_codes)
+    best = [None] * (1 << n)  # Remaining-card mask -> most points coverable
+    choice = [0] * (1 << n)
+    best[0] = 0
+
+    # Wilds are interchangeable except when 3s are wild: the run boundary
+    # rule rejects extra wilds next to a wild 3 but not next to a Joker, so
+    # then the two kinds are placed separately
+    split_wilds = wild_idx == 0
+    jokers = [i for i in wild_positions if pos_codes[i] & RANK_MASK == JOKER_INDEX]
+    wild_threes = [i for i in wild_positions if pos_codes[i] & RANK_MASK != JOKER_INDEX]
+
+    def take(mask, candidates, count):
+        """Bits of the first count available positions in candidates, or -1"""
+        used = 0
+        for i in candidates:
+            if not count:
+                break
+            if mask & (1 << i):
+                used |= 1 << i
+                count -= 1
+        return -1 if count else used
+
+    def placements(mask, codes, num_wilds):
+        """Bitmasks of the lowest available cards for a meld type"""
+        used = 0
+        for code in codes:
+            for i in positions[code]:
+                bit = 1 << i
+                if mask & bit and not used & bit:
+                    used |= bit
+                    break
+            else:
+                return
+        if not split_wilds:
+            wilds = take(mask, wild_positions, num_wilds)
+            if wilds >= 0:
+                yield used | wilds
+            return
+        for num_jokers in range(num_wilds + 1):
+            joker_bits = take(mask, jokers, num_jokers)
+            three_bits = take(mask, wild_threes, num_wilds - num_jokers)
+            if joker_bits < 0 or three_bits < 0:
+                continue
+            meld = used | joker_bits | three_bits
+            sig = tuple(sorted(pos_codes[i] for i in range(n) if meld >> i & 1))
+            if MeldValidator.is_valid_sig(sig, wild_idx):
+                yield meld
+
+    def moves(mask, lowest):
+        """(cards, points) of every meld placement that uses the lowest card"""
+        # The default must be a list: compiled with Cython, get() is typed
+        # by the List annotation on types_by_code and rejects a tuple
+        for codes, num_wilds, value in types_by_code.get(pos_codes[lowest], []):
+            for used in placements(mask, codes, num_wilds):
+                yield used, value
+
+    def solve(mask, total):
+        """Most points coverable from the cards in mask, which are worth total"""
+        found = best[mask]
+        if found is not None:
+            return found
+        low = mask & -mask
+        lowest = low.bit_length() - 1
+        if go_out_only:
+            result = -1  # Lowest card must go in a meld
+        else:
+            # Leave the lowest card out of every meld
+            result = solve(mask ^ low, total - pos_points[lowest])
+        taken = 0
+        for used, value in moves(mask, lowest):
+            rest = solve(mask ^ used, total - value)
+            if rest >= 0 and value + rest > result:
+                result, taken = value + rest, used
+                if result == total:
+                    break  # Every card melded; nothing can do better
+        best[mask] = result
+        choice[mask] = taken
+        return result
 
-        if remaining_points == 0:
-            return True, melds
-        return False, None
+    return solve((1 << n) - 1, sum(pos_points)), choice
+
+
+# The best combination depends only on the multiset of cards and the wild
+# rank, and the same hand is searched repeatedly (AI decisions, suggestions,
+# scoring). The search runs on a hand rebuilt in code order and returns melds
+# as code tuples that find_best_meld_combination maps back to the caller's cards.
+@lru_cache(maxsize=4096)
+def _cached_find_best(sig: Tuple[int, ...], wild_rank: str) -> Tuple[Tuple[Tuple[int, ...], ...], int]:
+    """find_best_meld_combination over a sorted code signature"""
+    hand = [pooled_card(_RANK_BY_INDEX[code & RANK_MASK], _SUIT_BY_BIT[code & SUIT_MASK]) for code in sig]
+    melds, remaining_points = MeldFinder._solve_best_combination(hand, wild_rank)
+    return tuple(tuple(card.code for card in meld) for meld in melds), remaining_points
+
+
+@lru_cache(maxsize=1024)
+def _cached_go_out(sig: Tuple[int, ...], wild_rank: str) -> Optional[Tuple[Tuple[int, ...], ...]]:
+    """Melds (as codes) covering a sorted code signature, or None if it can't go out"""
+    hand = [pooled_card(_RANK_BY_INDEX[code & RANK_MASK], _SUIT_BY_BIT[code & SUIT_MASK]) for code in sig]
+    melds, remaining_points = MeldFinder._solve_best_combination(hand, wild_rank, go_out_only=True)
+    if remaining_points:
+        return None
+    return tuple(tuple(card.code for card in meld) for meld in melds)
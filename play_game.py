@@ -4,12 +4,34 @@ Five Crowns - Main Game Loop
 Play Five Crowns against computer opponents
 """
 
+import argparse
+import random
+import re
 import sys
-from typing import List, Optional
+from functools import lru_cache
+from multiprocessing import Pool
+from typing import List, Optional, Pattern, Set, Tuple
 from game_engine import GameEngine, Player
 from ai_player import AIPlayer, AIStrategy
 from meld_finder import MeldFinder
-from five_crowns import Card, MeldValidator
+from five_crowns import Card, MeldValidator, RANK_MASK, round_points
+
+
+# Accepted answers for each prompt (matched against the whole stripped,
+# lowercased input), compiled once
+_DECK_OR_PILE = re.compile(r'[dp]')
+_YES_OR_NO = re.compile(r'[yn]')
+_CARD_NUMBER = re.compile(r'\d+')
+_MELD_CHOICE = re.compile(r'done|\d+(?:\s+\d+)*|')  # Empty input just re-prompts
+
+
+@lru_cache(maxsize=None)
+def _format_card(card: Card, wild_rank: str, marker: str = " (WILD)") -> str:
+    """
+    Card text, with marker appended when the card is wild.
+    Cards are pooled, so each (card, wild rank, marker) is formatted once per game.
+    """
+    return f"{card}{marker}" if MeldValidator.is_wild(card, wild_rank) else str(card)
 
 
 class GameUI:
@@ -18,35 +40,45 @@ class GameUI:
     @staticmethod
     def display_hand(player: Player, wild_rank: str):
         """Display a player's hand"""
-        print(f"\n{player.name}'s hand:")
         player.sort_hand()
 
+        # Build the section and print it in one call
+        lines = [f"\n{player.name}'s hand:"]
         for i, card in enumerate(player.hand, 1):
-            wild_marker = " (WILD)" if MeldValidator.is_wild(card, wild_rank) else ""
-            print(f"  {i}. {card}{wild_marker}")
+            lines.append(f"  {i}. {_format_card(card, wild_rank)}")
+        print("\n".join(lines))
 
     @staticmethod
     def display_scores(players: List[Player]):
         """Display current scores"""
-        print("\n" + "=" * 50)
-        print("SCORES:")
+        lines = ["\n" + "=" * 50, "SCORES:"]
         for player in players:
-            print(f"  {player.name}: {player.score} points")
-        print("=" * 50)
+            lines.append(f"  {player.name}: {player.score} points")
+        lines.append("=" * 50)
+        print("\n".join(lines))
 
     @staticmethod
-    def display_game_state(engine: GameEngine):
+    def display_game_state(engine: GameEngine, wild_rank: str):
         """Display current game state"""
         state = engine.state
-        print(f"\n{'='*50}")
-        print(f"ROUND {state.round_number} - Wild card: {state.get_wild_rank()}")
-        print(f"{'='*50}")
+        lines = [f"\n{'='*50}",
+                 f"ROUND {state.round_number} - Wild card: {wild_rank}",
+                 f"{'='*50}"]
 
         discard = state.deck.peek_discard()
         if discard:
-            wild_marker = " (WILD)" if MeldValidator.is_wild(discard, state.get_wild_rank()) else ""
-            print(f"Top of discard pile: {discard}{wild_marker}")
-        print(f"Cards in deck: {state.deck.cards_remaining()}")
+            lines.append(f"Top of discard pile: {_format_card(discard, wild_rank)}")
+        lines.append(f"Cards in deck: {state.deck.cards_remaining()}")
+        print("\n".join(lines))
+
+    @staticmethod
+    def prompt(pattern: Pattern, message: str, error: str) -> str:
+        """Ask until the stripped, lowercased answer fully matches pattern, then return it"""
+        while True:
+            choice = input(message).strip().lower()
+            if pattern.fullmatch(choice):
+                return choice
+            print(error)
 
     @staticmethod
     def get_player_draw_choice(discard_card: Optional[Card], wild_rank: str) -> bool:
@@ -55,123 +87,135 @@ class GameUI:
             print("\nDiscard pile is empty. Drawing from deck.")
             return False
 
-        wild_marker = " (WILD)" if MeldValidator.is_wild(discard_card, wild_rank) else ""
-        print(f"\nTop of discard pile: {discard_card}{wild_marker}")
+        print(f"\nTop of discard pile: {_format_card(discard_card, wild_rank)}")
 
-        while True:
-            choice = input("Draw from (d)eck or (p)ile? ").strip().lower()
-            if choice == 'd':
-                return False
-            elif choice == 'p':
-                return True
-            else:
-                print("Invalid choice. Enter 'd' for deck or 'p' for pile.")
+        choice = GameUI.prompt(_DECK_OR_PILE, "Draw from (d)eck or (p)ile? ",
+                               "Invalid choice. Enter 'd' for deck or 'p' for pile.")
+        return choice == 'p'
 
     @staticmethod
-    def get_player_discard_choice(player: Player, wild_rank: str) -> Card:
-        """Ask player which card to discard"""
+    def get_player_discard_choice(player: Player, wild_rank: str) -> Tuple[Card, int]:
+        """Ask player which card to discard. Returns the card and its position in hand."""
         GameUI.display_hand(player, wild_rank)
 
+        # The hand doesn't change while we ask, so size the prompt once
+        num_cards = len(player.hand)
+        message = f"\nWhich card to discard (1-{num_cards})? "
         while True:
-            try:
-                choice = input(f"\nWhich card to discard (1-{len(player.hand)})? ").strip()
-                idx = int(choice) - 1
+            idx = int(GameUI.prompt(_CARD_NUMBER, message, "Please enter a valid number")) - 1
 
-                if 0 <= idx < len(player.hand):
-                    return player.hand[idx]
-                else:
-                    print(f"Please enter a number between 1 and {len(player.hand)}")
-            except ValueError:
-                print("Please enter a valid number")
+            if 0 <= idx < num_cards:
+                return player.hand[idx], idx
+            print(f"Please enter a number between 1 and {num_cards}")
 
     @staticmethod
     def ask_go_out(player: Player, wild_rank: str) -> bool:
         """Ask if player wants to try to go out"""
-        while True:
-            choice = input("\nDo you want to try to go out? (y/n) ").strip().lower()
-            if choice == 'y':
-                return True
-            elif choice == 'n':
-                return False
-            else:
-                print("Please enter 'y' or 'n'")
+        choice = GameUI.prompt(_YES_OR_NO, "\nDo you want to try to go out? (y/n) ",
+                               "Please enter 'y' or 'n'")
+        return choice == 'y'
 
     @staticmethod
     def display_melds(melds: List[List[Card]], wild_rank: str):
         """Display melds"""
-        for i, meld in enumerate(melds, 1):
-            cards_str = ", ".join(
-                f"{card}{'(W)' if MeldValidator.is_wild(card, wild_rank) else ''}"
-                for card in meld
-            )
-            print(f"  Meld {i}: {cards_str}")
+        if melds:
+            print("\n".join(GameUI.meld_lines(melds, wild_rank)))
 
     @staticmethod
-    def let_player_arrange_melds(player: Player, wild_rank: str) -> List[List[Card]]:
-        """Let player manually arrange their cards into melds"""
+    def meld_lines(melds: List[List[Card]], wild_rank: str, indent: str = "  ") -> List[str]:
+        """One 'Meld i: ...' line per meld, for callers building a section to print at once"""
+        # Joining a list is faster than joining a generator, which CPython
+        # turns into a list first anyway
+        return [
+            f"{indent}Meld {i}: " + ", ".join([_format_card(card, wild_rank, "(W)") for card in meld])
+            for i, meld in enumerate(melds, 1)
+        ]
+
+    @staticmethod
+    def let_player_arrange_melds(player: Player, wild_rank: str) -> Tuple[List[List[Card]], Set[int]]:
+        """
+        Let player manually arrange their cards into melds.
+        Returns the melds and the positions in player.hand of the cards used.
+        """
         print(f"\n{player.name}, arrange your remaining cards into melds:")
 
         available_cards = player.hand.copy()
+        available_positions = list(range(len(available_cards)))  # Hand position of each available card
+        used_positions = set()
         melds = []
+        # Cards and suggestion are only listed again after a meld uses cards,
+        # so re-prompting after bad input neither reprints nor searches again
+        dirty = True
 
         while True:
-            print(f"\nAvailable cards ({len(available_cards)} remaining):")
-            for i, card in enumerate(available_cards, 1):
-                wild_marker = " (WILD)" if MeldValidator.is_wild(card, wild_rank) else ""
-                print(f"  {i}. {card}{wild_marker}")
-
-            if not available_cards:
-                print("\nNo cards left!")
-                break
-
-            # Show suggestion from computer
-            suggestion_melds, suggestion_points = MeldFinder.find_best_meld_combination(available_cards, wild_rank)
-            if suggestion_melds:
-                print(f"\nSuggestion (leaves {suggestion_points} points):")
-                for i, meld in enumerate(suggestion_melds, 1):
-                    cards_str = ", ".join(
-                        f"{card}{'(W)' if MeldValidator.is_wild(card, wild_rank) else ''}"
-                        for card in meld
-                    )
-                    print(f"  Meld {i}: {cards_str}")
-
-            choice = input("\nEnter card numbers for a meld (e.g., '1 2 3'), or 'done' to finish: ").strip().lower()
+            if dirty:
+                dirty = False
+                num_available = len(available_cards)
+                lines = [f"\nAvailable cards ({num_available} remaining):"]
+                for i, card in enumerate(available_cards, 1):
+                    lines.append(f"  {i}. {_format_card(card, wild_rank)}")
+
+                if not available_cards:
+                    lines.append("\nNo cards left!")
+                    print("\n".join(lines))
+                    break
+
+                # Show suggestion from computer
+                suggestion_melds, suggestion_points = MeldFinder.find_best_meld_combination(available_cards, wild_rank)
+                if suggestion_melds:
+                    lines.append(f"\nSuggestion (leaves {suggestion_points} points):")
+                    lines.extend(GameUI.meld_lines(suggestion_melds, wild_rank))
+                print("\n".join(lines))
+
+            choice = GameUI.prompt(
+                _MELD_CHOICE,
+                "\nEnter card numbers for a meld (e.g., '1 2 3'), or 'done' to finish: ",
+                "Invalid input! Enter card numbers separated by spaces (e.g., '1 2 3')")
 
             if choice == 'done':
                 break
 
-            try:
-                indices = [int(x) - 1 for x in choice.split()]
+            indices = [int(x) - 1 for x in choice.split()]
 
-                if not indices:
-                    continue
+            if not indices:
+                continue
 
-                if any(i < 0 or i >= len(available_cards) for i in indices):
-                    print("Invalid card numbers!")
-                    continue
+            if any(i < 0 or i >= num_available for i in indices):
+                print("Invalid card numbers!")
+                continue
 
-                # Get the selected cards
-                selected_cards = [available_cards[i] for i in indices]
+            if len(set(indices)) != len(indices):
+                print("Each card can only be used once!")
+                continue
 
-                # Validate the meld
-                is_book = MeldValidator.is_valid_book(selected_cards, wild_rank)
-                is_run = MeldValidator.is_valid_run(selected_cards, wild_rank)
+            # Get the selected cards
+            selected_cards = [available_cards[i] for i in indices]
 
-                if is_book or is_run:
-                    meld_type = "book" if is_book else "run"
-                    print(f"✓ Valid {meld_type}!")
-                    melds.append(selected_cards)
+            # Validate the meld
+            meld_type = MeldValidator.meld_type(selected_cards, wild_rank)
 
-                    # Remove used cards
-                    for i in sorted(indices, reverse=True):
-                        available_cards.pop(i)
-                else:
-                    print("✗ Invalid meld! Must be a valid book (same rank, different suits) or run (consecutive ranks, same suit)")
+            if meld_type:
+                print(f"✓ Valid {meld_type}!")
+                melds.append(selected_cards)
+
+                # Remove used cards in one pass
+                selected = set(indices)
+                used_positions.update(available_positions[i] for i in selected)
+                available_cards = [card for j, card in enumerate(available_cards) if j not in selected]
+                available_positions = [pos for j, pos in enumerate(available_positions) if j not in selected]
+                dirty = True
+            else:
+                print("✗ Invalid meld! Must be a valid book (same rank, different suits) or run (consecutive ranks, same suit)")
 
-            except ValueError:
-                print("Invalid input! Enter card numbers separated by spaces (e.g., '1 2 3')")
+        return melds, used_positions
 
-        return melds
+    @staticmethod
+    def meld_positions(hand: List[Card], melds: List[List[Card]]) -> Set[int]:
+        """Positions in hand of the cards in melds (equal cards fill distinct positions)"""
+        positions = {}
+        for i, card in enumerate(hand):
+            positions.setdefault(card.code, []).append(i)
+        return {positions[card.code].pop() for meld in melds for card in meld}
 
     @staticmethod
     def announce_round_end(players: List[Player], wild_rank: str, winner_name: str):
@@ -179,58 +223,47 @@ class GameUI:
         print(f"\n{winner_name} went out!")
         print("\nRound scores:")
 
+        points = round_points(wild_rank)
+
         for player in players:
             if player.hand:
                 # Let human players arrange their own melds
                 if player.is_human:
-                    melds = GameUI.let_player_arrange_melds(player, wild_rank)
+                    melds, used_positions = GameUI.let_player_arrange_melds(player, wild_rank)
                 else:
                     # Computer players use optimal meld finder
                     melds, _ = MeldFinder.find_best_meld_combination(player.hand, wild_rank)
+                    used_positions = GameUI.meld_positions(player.hand, melds)
 
                 # Calculate points for remaining cards
-                cards_in_melds = set(id(card) for meld in melds for card in meld)
-                remaining_cards = [card for card in player.hand if id(card) not in cards_in_melds]
-
-                remaining_points = 0
-                for card in remaining_cards:
-                    if MeldValidator.is_wild(card, wild_rank):
-                        remaining_points += 20
-                    elif card.rank in ['J', 'Q', 'K']:
-                        remaining_points += 10
-                    else:
-                        remaining_points += int(card.rank)
+                remaining_cards = [card for i, card in enumerate(player.hand) if i not in used_positions]
+
+                remaining_points = sum(points[card.code & RANK_MASK] for card in remaining_cards)
 
                 # Add to player's score
                 player.score += remaining_points
 
-                print(f"\n  {player.name}: +{remaining_points} points")
+                lines = [f"\n  {player.name}: +{remaining_points} points"]
 
                 if melds:
-                    print(f"    Melds laid down:")
-                    for i, meld in enumerate(melds, 1):
-                        cards_str = ", ".join(
-                            f"{card}{'(W)' if MeldValidator.is_wild(card, wild_rank) else ''}"
-                            for card in meld
-                        )
-                        print(f"      Meld {i}: {cards_str}")
+                    lines.append(f"    Melds laid down:")
+                    lines.extend(GameUI.meld_lines(melds, wild_rank, indent="      "))
 
                 if remaining_cards:
-                    print(f"    Remaining cards:")
+                    lines.append(f"    Remaining cards:")
                     for card in remaining_cards:
-                        wild_marker = " (WILD)" if MeldValidator.is_wild(card, wild_rank) else ""
-                        print(f"      {card}{wild_marker}")
+                        lines.append(f"      {_format_card(card, wild_rank)}")
+                print("\n".join(lines))
             else:
                 print(f"  {player.name}: 0 points (went out)")
 
 
-def play_human_turn(engine: GameEngine, player: Player) -> bool:
+def play_human_turn(engine: GameEngine, player: Player, wild_rank: str) -> bool:
     """
     Play a human player's turn.
     Returns True if player went out.
     """
     state = engine.state
-    wild_rank = state.get_wild_rank()
 
     print(f"\n{'*'*50}")
     print(f"{player.name}'s turn")
@@ -248,8 +281,7 @@ def play_human_turn(engine: GameEngine, player: Player) -> bool:
         print(f"\nDrew from discard pile: {drawn}")
     else:
         drawn = engine.draw_card(from_discard=False)
-        wild_marker = " (WILD)" if MeldValidator.is_wild(drawn, wild_rank) else ""
-        print(f"\nDrew from deck: {drawn}{wild_marker}")
+        print(f"\nDrew from deck: {_format_card(drawn, wild_rank)}")
 
     # Check if player wants to go out
     if GameUI.ask_go_out(player, wild_rank):
@@ -262,8 +294,8 @@ def play_human_turn(engine: GameEngine, player: Player) -> bool:
                 print(f"ERROR: Could not go out - {error}")
 
     # Discard phase
-    card_to_discard = GameUI.get_player_discard_choice(player, wild_rank)
-    engine.discard_card(card_to_discard)
+    card_to_discard, index = GameUI.get_player_discard_choice(player, wild_rank)
+    engine.discard_card(card_to_discard, index)
     print(f"\nDiscarded: {card_to_discard}")
 
     return False
@@ -275,7 +307,8 @@ def play_round(engine: GameEngine) -> str:
     Returns the name of the player who went out.
     """
     engine.setup_round()
-    GameUI.display_game_state(engine)
+    wild_rank = engine.state.get_wild_rank()  # Fixed for the whole round
+    GameUI.display_game_state(engine, wild_rank)
 
     winner_name = None
     going_out_player_index = None
@@ -292,7 +325,7 @@ def play_round(engine: GameEngine) -> str:
         current_player = engine.state.current_player()
 
         if current_player.is_human:
-            went_out = play_human_turn(engine, current_player)
+            went_out = play_human_turn(engine, current_player, wild_rank)
         else:
             # AI turn
             print(f"\n{'*'*50}")
@@ -301,13 +334,10 @@ def play_round(engine: GameEngine) -> str:
 
             went_out, turn_info = AIPlayer.take_turn(engine, current_player)
 
-            wild_rank = engine.state.get_wild_rank()
-
             # Show where AI drew from
             if turn_info['draw_source'] == 'discard':
                 drew_card = turn_info['drew_card']
-                wild_marker = " (WILD)" if MeldValidator.is_wild(drew_card, wild_rank) else ""
-                print(f"{current_player.name} drew from discard pile: {drew_card}{wild_marker}")
+                print(f"{current_player.name} drew from discard pile: {_format_card(drew_card, wild_rank)}")
             else:
                 print(f"{current_player.name} drew from the deck")
 
@@ -317,8 +347,7 @@ def play_round(engine: GameEngine) -> str:
                 # Show what AI discarded
                 if turn_info['discarded']:
                     discarded = turn_info['discarded']
-                    wild_marker = " (WILD)" if MeldValidator.is_wild(discarded, wild_rank) else ""
-                    print(f"{current_player.name} discarded: {discarded}{wild_marker}")
+                    print(f"{current_player.name} discarded: {_format_card(discarded, wild_rank)}")
 
         if went_out and going_out_player_index is None:
             # First player to go out
@@ -399,7 +428,112 @@ def main():
     print("\nThanks for playing!")
 
 
+# Turn cap for a headless round. Computer players can stall, e.g. passing the
+# same discard back and forth, so a round nobody has gone out of by then is
+# scored as it stands.
+MAX_ROUND_TURNS = 200
+
+
+def play_game_headless(seed: int, num_players: int = 2) -> List[int]:
+    """
+    Play a full game between computer players, with no input or output.
+    Shuffles are seeded with seed, so a game can be replayed exactly.
+    Always finishes: see MAX_ROUND_TURNS. Returns each player's final score.
+    """
+    random.seed(seed)
+    engine = GameEngine([(f"Computer {i+1}", False) for i in range(num_players)])
+    state = engine.state
+
+    for round_num in range(1, 12):
+        state.round_number = round_num
+        engine.setup_round()
+        wild_rank = state.get_wild_rank()
+
+        # Same turn order as play_round: after someone goes out, the
+        # others get one more turn. A stalled round also ends once the deck
+        # runs out or after MAX_ROUND_TURNS turns, with normal scoring
+        going_out_player_index = None
+        turns = 0
+        while going_out_player_index != state.current_player_index:
+            if turns >= MAX_ROUND_TURNS or not engine.can_draw_from_deck():
+                break
+            turns += 1
+            went_out, _ = AIPlayer.take_turn(engine, state.current_player())
+            if went_out and going_out_player_index is None:
+                going_out_player_index = state.current_player_index
+            state.next_player()
+
+        # Score the round as announce_round_end does for computer players
+        for player in state.players:
+            if player.hand:
+                _, remaining_points = MeldFinder.find_best_meld_combination(player.hand, wild_rank)
+                player.score += remaining_points
+        engine.end_round()
+
+    return [player.score for player in state.players]
+
+
+def _play_seeded_game(args: Tuple[int, int]) -> List[int]:
+    """Pool worker: play_game_headless on a (seed, num_players) pair"""
+    return play_game_headless(*args)
+
+
+def simulate(num_games: int, num_players: int = 2, workers: Optional[int] = None,
+             seed: int = 0) -> List[List[int]]:
+    """
+    Play num_games headless games across a pool of worker processes
+    (workers=None uses every core). Game i is seeded with seed + i.
+    Returns the final scores of every game, in completion order.
+    """
+    jobs = [(seed + i, num_players) for i in range(num_games)]
+    with Pool(workers) as pool:
+        return list(pool.imap_unordered(_play_seeded_game, jobs, chunksize=max(1, num_games // 64)))
+
+
+def report_simulation(results: List[List[int]]):
+    """Print wins and average score per player for simulated games"""
+    num_players = len(results[0])
+    wins = [0] * num_players
+    totals = [0] * num_players
+    for scores in results:
+        wins[scores.index(min(scores))] += 1  # Ties go to the earlier seat
+        for i, score in enumerate(scores):
+            totals[i] += score
+
+    lines = [f"Simulated {len(results)} games"]
+    for i in range(num_players):
+        lines.append(f"  Computer {i+1}: {wins[i]} wins, "
+                     f"average {totals[i] / len(results):.1f} points")
+    print("\n".join(lines))
+
+
+def _positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Command-line options; with none given, an interactive game is played"""
+    parser = argparse.ArgumentParser(description="Play Five Crowns against computer opponents")
+    parser.add_argument('--simulate', type=_positive_int, metavar='N',
+                        help="play N computer-only games without any output and report the results")
+    parser.add_argument('--players', type=int, default=2, choices=range(2, 5),
+                        help="players per simulated game (default: 2)")
+    parser.add_argument('--workers', type=_positive_int, default=None,
+                        help="worker processes for --simulate (default: one per core)")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="seed of the first simulated game (default: 0)")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.simulate is not None:
+        report_simulation(simulate(args.simulate, args.players, args.workers, args.seed))
+        sys.exit(0)
     try:
         main()
     except KeyboardInterrupt:
@@ -0,0 +1,28 @@
+"""
+Optional build script: compiles five_crowns.py (meld validation) and
+meld_finder.py (meld search) into C extensions with Cython.
+
+    pip install cython
+    python setup.py build_ext --inplace
+
+Nothing else changes - a compiled module is picked up by `import five_crowns`
+or `import meld_finder` when present, and the plain .py file is used when it
+isn't. Delete the built extensions (five_crowns.*.so, meld_finder.*.so / .pyd)
+to go back to pure Python.
+"""
+
+from setuptools import setup
+
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    raise SystemExit("Cython is required to build the extension: pip install cython")
+
+setup(
+    name='five_crowns',
+    ext_modules=cythonize(
+        ['five_crowns.py', 'meld_finder.py'],
+        language_level=3,
+        compiler_directives={'boundscheck': False, 'wraparound': False},
+    ),
+)
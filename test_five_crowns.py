@@ -2,216 +2,177 @@
 Tests for Five Crowns Meld Validation
 """
 
+import copy
+import os
 import unittest
-from five_crowns import Card, Suit, MeldValidator, ValidationResult, create_card, create_joker
+from dataclasses import FrozenInstanceError
+import five_crowns
+from five_crowns import (
+    Card, Suit, MeldError, MeldValidator, ValidationResult, create_card, create_joker,
+    JOKER, RANK_MASK, SUIT_MASK, SUIT_BITS
+)
 
 
 class TestWildCardRounds(unittest.TestCase):
     """Test that wild cards are correct for each round"""
     
     def test_round_wild_cards(self):
-        self.assertEqual(MeldValidator.get_wild_card(1), '3')
-        self.assertEqual(MeldValidator.get_wild_card(2), '4')
-        self.assertEqual(MeldValidator.get_wild_card(3), '5')
-        self.assertEqual(MeldValidator.get_wild_card(4), '6')
-        self.assertEqual(MeldValidator.get_wild_card(5), '7')
-        self.assertEqual(MeldValidator.get_wild_card(6), '8')
-        self.assertEqual(MeldValidator.get_wild_card(7), '9')
-        self.assertEqual(MeldValidator.get_wild_card(8), '10')
-        self.assertEqual(MeldValidator.get_wild_card(9), 'J')
-        self.assertEqual(MeldValidator.get_wild_card(10), 'Q')
-        self.assertEqual(MeldValidator.get_wild_card(11), 'K')
+        # One comparison; on failure the tuple diff shows which rounds differ
+        expected = ('3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K')
+        self.assertEqual(tuple(MeldValidator.get_wild_card(r) for r in range(1, 12)), expected)
 
 
-class TestValidBooks(unittest.TestCase):
-    """Test valid book (set) formations"""
+class TestCardEncoding(unittest.TestCase):
+    """Test the integer encoding carried by each card"""
+    
+    def test_code_packs_rank_and_suit(self):
+        card = create_card('10', 'D')
+        self.assertEqual(card.code & RANK_MASK, MeldValidator.RANK_VALUES['10'])
+        self.assertEqual(card.code & SUIT_MASK, SUIT_BITS[Suit.DIAMONDS])
+    
+    def test_equal_cards_share_code(self):
+        """Two copies of the same card compare and hash equal"""
+        a = create_card('7', 'H')
+        b = create_card('7', 'H')
+        self.assertEqual(a, b)
+        self.assertEqual(hash(a), hash(b))
+        self.assertNotEqual(a, create_card('7', 'S'))
+        self.assertNotEqual(a, create_card('8', 'H'))
+    
+    def test_cards_are_immutable(self):
+        card = create_card('7', 'H')
+        with self.assertRaises(FrozenInstanceError):
+            card.rank = '8'
+    
+    def test_copy_preserves_code(self):
+        card = create_card('Q', 'T')
+        self.assertEqual(copy.deepcopy(card).code, card.code)
+    
+    def test_wild_index_api_matches_string_api(self):
+        wild_idx = MeldValidator.wild_index('5')
+        cards = [create_card('9', 'H'), create_card('9', 'S'), create_card('5', 'C')]
+        self.assertTrue(MeldValidator.is_wild_code(cards[2].code, wild_idx))
+        self.assertTrue(MeldValidator.is_wild_code(create_joker().code, wild_idx))
+        self.assertFalse(MeldValidator.is_wild_code(cards[0].code, wild_idx))
+        self.assertEqual(MeldValidator.is_valid_book_idx(cards, wild_idx),
+                         MeldValidator.is_valid_book(cards, '5'))
+        self.assertEqual(MeldValidator.is_valid_run_idx(cards, wild_idx),
+                         MeldValidator.is_valid_run(cards, '5'))
+    
+    def test_all_cards_have_distinct_codes(self):
+        codes = {create_card(rank, suit).code
+                 for rank in MeldValidator.RANK_ORDER for suit in 'SHCDT'}
+        codes.add(create_joker().code)
+        self.assertEqual(len(codes), 11 * 5 + 1)
+
+
+class TestValidationCache(unittest.TestCase):
+    """Test that validation is memoized on the card multiset"""
     
-    def test_simple_book_no_wilds(self):
-        """Three 7s of different suits"""
-        cards = [
-            create_card('7', 'H'),
-            create_card('7', 'S'),
-            create_card('7', 'C')
-        ]
-        self.assertTrue(MeldValidator.is_valid_book(cards, '3'))
+    def test_reordered_meld_hits_cache(self):
+        five_crowns._cached_is_valid_run.cache_clear()
+        cards = [create_card('5', 'H'), create_card('6', 'H'), create_joker()]
+        self.assertTrue(MeldValidator.is_valid_run(cards, '3'))
+        self.assertTrue(MeldValidator.is_valid_run(list(reversed(cards)), '3'))
+        info = five_crowns._cached_is_valid_run.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
     
-    def test_book_with_wild(self):
-        """Two 9s plus a wild 5"""
-        cards = [
-            create_card('9', 'H'),
-            create_card('9', 'S'),
-            create_card('5', 'C')  # Wild card in round 3
-        ]
+    def test_wild_rank_is_part_of_key(self):
+        cards = [create_card('8', 'H'), create_card('8', 'S'), create_card('5', 'C')]
         self.assertTrue(MeldValidator.is_valid_book(cards, '5'))
+        self.assertFalse(MeldValidator.is_valid_book(cards, '6'))
+
+
+# Book and run cases as (description, cards, wild rank), built once at import
+# and checked as subtests of one method per class
+
+VALID_BOOKS = [
+    ("Three 7s of different suits",
+     [create_card('7', 'H'), create_card('7', 'S'), create_card('7', 'C')], '3'),
+    ("Two 9s plus a wild 5",
+     [create_card('9', 'H'), create_card('9', 'S'), create_card('5', 'C')], '5'),
+    ("Four Jacks",
+     [create_card('J', 'H'), create_card('J', 'S'), create_card('J', 'C'), create_card('J', 'D')], '3'),
+    ("All five suits of 8s",
+     [create_card('8', 'H'), create_card('8', 'S'), create_card('8', 'C'), create_card('8', 'D'),
+      create_card('8', 'T')], '3'),
+]
+
+INVALID_BOOKS = [
+    ("Two hearts - invalid",
+     [create_card('7', 'H'), create_card('7', 'H'), create_card('7', 'S')], '3'),
+    ("Mix of 7s and 8s - invalid",
+     [create_card('7', 'H'), create_card('8', 'S'), create_card('7', 'C')], '3'),
+    ("All wild cards - invalid (need at least one real card)",
+     [create_card('5', 'H'), create_card('5', 'S'), create_card('5', 'C')], '5'),
+    ("Only 2 cards - invalid",
+     [create_card('7', 'H'), create_card('7', 'S')], '3'),
+]
+
+VALID_RUNS = [
+    ("5-6-7 of hearts",
+     [create_card('5', 'H'), create_card('6', 'H'), create_card('7', 'H')], '3'),
+    ("5-wild-7 of spades (wild 3 fills the 6 spot)",
+     [create_card('5', 'S'), create_card('3', 'S'), create_card('7', 'S')], '3'),
+    ("7-8-9-10-J of clubs",
+     [create_card('7', 'C'), create_card('8', 'C'), create_card('9', 'C'), create_card('10', 'C'),
+      create_card('J', 'C')], '3'),
+    ("5-wild-wild-8 of hearts (wild 3s represent 6 and 7)",
+     [create_card('5', 'H'), create_card('3', 'H'), create_card('3', 'D'), create_card('8', 'H')], '3'),
+    ("5-6-wild of diamonds (wild 4 represents 7)",
+     [create_card('5', 'D'), create_card('6', 'D'), create_card('4', 'D')], '4'),
+]
+
+INVALID_RUNS = [
+    ("5H-6S-7H - different suits",
+     [create_card('5', 'H'), create_card('6', 'S'), create_card('7', 'H')], '3'),
+    ("5-6-9 with no wilds - gap too large",
+     [create_card('5', 'H'), create_card('6', 'H'), create_card('9', 'H')], '3'),
+    ("5-wild-9 (need 2 wilds to fill 6,7,8 but only have 1)",
+     [create_card('5', 'H'), create_card('3', 'H'), create_card('9', 'H')], '3'),
+    ("5-5-6 - duplicate rank",
+     [create_card('5', 'H'), create_card('5', 'H'), create_card('6', 'H')], '3'),
+    ("All wild cards - invalid",
+     [create_card('3', 'H'), create_card('3', 'S'), create_card('3', 'C')], '3'),
+    ("Only 2 cards",
+     [create_card('5', 'H'), create_card('6', 'H')], '3'),
+]
+
+
+class TestValidBooks(unittest.TestCase):
+    """Test valid book (set) formations"""
     
-    def test_book_four_cards(self):
-        """Four Jacks"""
-        cards = [
-            create_card('J', 'H'),
-            create_card('J', 'S'),
-            create_card('J', 'C'),
-            create_card('J', 'D')
-        ]
-        self.assertTrue(MeldValidator.is_valid_book(cards, '3'))
-    
-    def test_book_five_suits(self):
-        """All five suits of 8s"""
-        cards = [
-            create_card('8', 'H'),
-            create_card('8', 'S'),
-            create_card('8', 'C'),
-            create_card('8', 'D'),
-            create_card('8', 'T')  # Stars
-        ]
-        self.assertTrue(MeldValidator.is_valid_book(cards, '3'))
+    def test_valid_books(self):
+        for description, cards, wild_rank in VALID_BOOKS:
+            with self.subTest(description):
+                self.assertTrue(MeldValidator.is_valid_book(cards, wild_rank))
 
 
 class TestInvalidBooks(unittest.TestCase):
     """Test invalid book formations"""
     
-    def test_book_duplicate_suits(self):
-        """Two hearts - invalid"""
-        cards = [
-            create_card('7', 'H'),
-            create_card('7', 'H'),  # Duplicate suit
-            create_card('7', 'S')
-        ]
-        self.assertFalse(MeldValidator.is_valid_book(cards, '3'))
-    
-    def test_book_mixed_ranks(self):
-        """Mix of 7s and 8s - invalid"""
-        cards = [
-            create_card('7', 'H'),
-            create_card('8', 'S'),  # Different rank
-            create_card('7', 'C')
-        ]
-        self.assertFalse(MeldValidator.is_valid_book(cards, '3'))
-    
-    def test_book_all_wilds(self):
-        """All wild cards - invalid (need at least one real card)"""
-        cards = [
-            create_card('5', 'H'),
-            create_card('5', 'S'),
-            create_card('5', 'C')
-        ]
-        self.assertFalse(MeldValidator.is_valid_book(cards, '5'))
-    
-    def test_book_too_few_cards(self):
-        """Only 2 cards - invalid"""
-        cards = [
-            create_card('7', 'H'),
-            create_card('7', 'S')
-        ]
-        self.assertFalse(MeldValidator.is_valid_book(cards, '3'))
+    def test_invalid_books(self):
+        for description, cards, wild_rank in INVALID_BOOKS:
+            with self.subTest(description):
+                self.assertFalse(MeldValidator.is_valid_book(cards, wild_rank))
 
 
 class TestValidRuns(unittest.TestCase):
     """Test valid run (sequence) formations"""
     
-    def test_simple_run_no_wilds(self):
-        """5-6-7 of hearts"""
-        cards = [
-            create_card('5', 'H'),
-            create_card('6', 'H'),
-            create_card('7', 'H')
-        ]
-        self.assertTrue(MeldValidator.is_valid_run(cards, '3'))
-    
-    def test_run_with_wild_filling_gap(self):
-        """5-wild-7 of spades (wild is 3)"""
-        cards = [
-            create_card('5', 'S'),
-            create_card('3', 'S'),  # Wild filling the 6 spot
-            create_card('7', 'S')
-        ]
-        self.assertTrue(MeldValidator.is_valid_run(cards, '3'))
-    
-    def test_run_long_sequence(self):
-        """7-8-9-10-J of clubs"""
-        cards = [
-            create_card('7', 'C'),
-            create_card('8', 'C'),
-            create_card('9', 'C'),
-            create_card('10', 'C'),
-            create_card('J', 'C')
-        ]
-        self.assertTrue(MeldValidator.is_valid_run(cards, '3'))
-    
-    def test_run_with_multiple_wilds(self):
-        """5-wild-wild-8 of hearts (wilds are 3s)"""
-        cards = [
-            create_card('5', 'H'),
-            create_card('3', 'H'),  # Represents 6
-            create_card('3', 'D'),  # Represents 7
-            create_card('8', 'H')
-        ]
-        self.assertTrue(MeldValidator.is_valid_run(cards, '3'))
-    
-    def test_run_wild_at_end(self):
-        """5-6-wild of diamonds"""
-        cards = [
-            create_card('5', 'D'),
-            create_card('6', 'D'),
-            create_card('4', 'D')  # Wild representing 7
-        ]
-        self.assertTrue(MeldValidator.is_valid_run(cards, '4'))
+    def test_valid_runs(self):
+        for description, cards, wild_rank in VALID_RUNS:
+            with self.subTest(description):
+                self.assertTrue(MeldValidator.is_valid_run(cards, wild_rank))
 
 
 class TestInvalidRuns(unittest.TestCase):
     """Test invalid run formations"""
     
-    def test_run_mixed_suits(self):
-        """5H-6S-7H - different suits"""
-        cards = [
-            create_card('5', 'H'),
-            create_card('6', 'S'),  # Wrong suit
-            create_card('7', 'H')
-        ]
-        self.assertFalse(MeldValidator.is_valid_run(cards, '3'))
-    
-    def test_run_gap_too_large(self):
-        """5-6-9 with no wilds - gap too large"""
-        cards = [
-            create_card('5', 'H'),
-            create_card('6', 'H'),
-            create_card('9', 'H')
-        ]
-        self.assertFalse(MeldValidator.is_valid_run(cards, '3'))
-    
-    def test_run_not_enough_wilds_for_gap(self):
-        """5-wild-9 (need 2 wilds to fill 6,7,8 but only have 1)"""
-        cards = [
-            create_card('5', 'H'),
-            create_card('3', 'H'),  # Only one wild
-            create_card('9', 'H')
-        ]
-        self.assertFalse(MeldValidator.is_valid_run(cards, '3'))
-    
-    def test_run_duplicate_ranks(self):
-        """5-5-6 - duplicate rank"""
-        cards = [
-            create_card('5', 'H'),
-            create_card('5', 'H'),  # Duplicate
-            create_card('6', 'H')
-        ]
-        self.assertFalse(MeldValidator.is_valid_run(cards, '3'))
-    
-    def test_run_all_wilds(self):
-        """All wild cards - invalid"""
-        cards = [
-            create_card('3', 'H'),
-            create_card('3', 'S'),
-            create_card('3', 'C')
-        ]
-        self.assertFalse(MeldValidator.is_valid_run(cards, '3'))
-    
-    def test_run_too_few_cards(self):
-        """Only 2 cards"""
-        cards = [
-            create_card('5', 'H'),
-            create_card('6', 'H')
-        ]
-        self.assertFalse(MeldValidator.is_valid_run(cards, '3'))
+    def test_invalid_runs(self):
+        for description, cards, wild_rank in INVALID_RUNS:
+            with self.subTest(description):
+                self.assertFalse(MeldValidator.is_valid_run(cards, wild_rank))
 
 
 class TestFullMeldValidation(unittest.TestCase):
@@ -254,6 +215,8 @@ class TestFullMeldValidation(unittest.TestCase):
         ]
         result = MeldValidator.validate_all_melds(melds, '3')
         self.assertFalse(result.is_valid)
+        self.assertEqual(result.error_code, MeldError.TOO_FEW_CARDS)
+        self.assertEqual(result.group_index, 1)
         self.assertIn("Group 2", result.error_message)
         self.assertIn("only 2 cards", result.error_message)
     
@@ -268,12 +231,26 @@ class TestFullMeldValidation(unittest.TestCase):
         ]
         result = MeldValidator.validate_all_melds(melds, '3')
         self.assertFalse(result.is_valid)
+        self.assertEqual(result.error_code, MeldError.NEITHER_BOOK_NOR_RUN)
+        self.assertEqual(result.group_index, 0)
         self.assertIn("neither a valid book nor run", result.error_message)
     
     def test_empty_melds_list(self):
         """Empty melds list should be valid"""
         result = MeldValidator.validate_all_melds([], '3')
         self.assertTrue(result.is_valid)
+    
+    def test_meld_type(self):
+        """meld_type names the kind of meld, or None when it's invalid"""
+        book = [create_card('9', 'H'), create_card('9', 'S'), create_joker()]
+        run = [create_card('9', 'H'), create_card('10', 'H'), create_card('3', 'C')]
+        both = [create_card('9', 'H'), create_joker(), create_joker()]
+        neither = [create_card('9', 'H'), create_card('10', 'S'), create_card('Q', 'C')]
+        self.assertEqual(MeldValidator.meld_type(book, '3'), 'book')
+        self.assertEqual(MeldValidator.meld_type(run, '3'), 'run')
+        self.assertEqual(MeldValidator.meld_type(both, '3'), 'book')
+        self.assertIsNone(MeldValidator.meld_type(neither, '3'))
+        self.assertIsNone(MeldValidator.meld_type([create_joker()] * 3, '3'))
 
 
 class TestEdgeCases(unittest.TestCase):
@@ -396,6 +373,11 @@ class TestJokerCards(unittest.TestCase):
         self.assertEqual(joker.suit, Suit.JOKER)
         self.assertEqual(str(joker), 'Joker')
     
+    def test_jokers_are_one_instance(self):
+        """create_joker() always returns the JOKER singleton"""
+        self.assertIs(create_joker(), JOKER)
+        self.assertIs(create_joker(), create_joker())
+    
     def test_joker_is_always_wild(self):
         """Jokers should be wild regardless of round"""
         joker = create_joker()
@@ -567,5 +549,6 @@ class TestJokerCards(unittest.TestCase):
 
 
 if __name__ == '__main__':
-    # Run all tests
-    unittest.main(verbosity=2)
+    # Run all tests; TEST_VERBOSITY=2 lists each one (as does -v), and
+    # buffer=True keeps passing tests' output off stdout
+    unittest.main(verbosity=int(os.environ.get('TEST_VERBOSITY', '1')), buffer=True)
@@ -2,11 +2,19 @@
 Tests for Game Engine, Meld Finder, and AI Player
 """
 
+import contextlib
+import io
+import os
+import random
 import unittest
+from unittest import mock
+import ai_player
+import meld_finder
+import play_game
 from game_engine import Deck, Player, GameState, GameEngine
 from meld_finder import MeldFinder
 from ai_player import AIStrategy
-from five_crowns import create_card, create_joker, MeldValidator
+from five_crowns import Card, Suit, create_card, create_joker, MeldValidator
 
 
 class TestDeck(unittest.TestCase):
@@ -18,13 +26,29 @@ class TestDeck(unittest.TestCase):
         # 2 copies * 11 ranks * 5 suits + 6 jokers = 116 cards
         self.assertEqual(len(deck.cards), 116)
 
+    def test_new_decks_share_pooled_cards(self):
+        """Decks reuse one pooled instance per distinct card"""
+        first, second = Deck(), Deck()
+        self.assertEqual(len(set(map(id, first.cards))), 11 * 5 + 1)
+        self.assertEqual(set(map(id, first.cards)), set(map(id, second.cards)))
+        self.assertIs(first.cards[0], create_card(first.cards[0].rank, 'S'))
+        first.shuffle()
+        first.deal(10)
+        self.assertEqual(len(second.cards), 116)
+
     def test_deck_shuffle(self):
         """Test that shuffle changes card order"""
+        # Seeded so the result can't flake; the global RNG is restored after
+        self.addCleanup(random.setstate, random.getstate())
+        random.seed(42)
+
         deck = Deck()
-        original_order = deck.cards.copy()
+        # New decks start in the shared template's order, so compare against
+        # that instead of copying; the list compare stops at the first change
+        self.assertEqual(deck.cards, Deck._TEMPLATE)
         deck.shuffle()
-        # Very unlikely to have same order after shuffle (though technically possible)
-        self.assertNotEqual(deck.cards, original_order)
+        self.assertNotEqual(deck.cards, Deck._TEMPLATE)
+        self.assertCountEqual(deck.cards, Deck._TEMPLATE)
 
     def test_deal_cards(self):
         """Test dealing cards"""
@@ -46,6 +70,20 @@ class TestDeck(unittest.TestCase):
         self.assertEqual(drawn_discard, card)
         self.assertEqual(len(deck.discard_pile), 0)
 
+    def test_peek_discard_tracks_top(self):
+        """Test peek_discard follows the top card as the pile grows and shrinks"""
+        deck = Deck()
+        self.assertIsNone(deck.peek_discard())
+        first, second = deck.draw(), deck.draw()
+        deck.add_to_discard(first)
+        deck.add_to_discard(second)
+        self.assertIs(deck.peek_discard(), second)
+
+        deck.draw_from_discard()
+        self.assertIs(deck.peek_discard(), first)
+        deck.draw_from_discard()
+        self.assertIsNone(deck.peek_discard())
+
 
 class TestPlayer(unittest.TestCase):
     """Test player functionality"""
@@ -70,6 +108,13 @@ class TestPlayer(unittest.TestCase):
         value = player.calculate_hand_value(wild_rank='5')
         self.assertEqual(value, 20 + 10 + 10)  # 5 is wild (20), J and K are 10 each
 
+    def test_calculate_hand_value_jokers_and_non_wild_ranks(self):
+        """Test jokers score 20 in any round and the wild rank only scores 20 in its round"""
+        player = Player(name="Test")
+        player.hand = [create_joker(), create_card('5', 'H'), create_card('3', 'S')]
+        self.assertEqual(player.calculate_hand_value(wild_rank='3'), 20 + 5 + 20)
+        self.assertEqual(player.calculate_hand_value(wild_rank='5'), 20 + 20 + 3)
+
     def test_add_remove_card(self):
         """Test adding and removing cards"""
         player = Player(name="Test")
@@ -81,6 +126,38 @@ class TestPlayer(unittest.TestCase):
         player.remove_card(card)
         self.assertEqual(len(player.hand), 0)
 
+    def test_remove_card_by_index_or_equal_card(self):
+        """Removing by index takes that position; an equal unpooled card still matches"""
+        player = Player(name="Test")
+        player.hand = [create_card('7', 'H'), create_card('8', 'S'), create_card('9', 'C')]
+
+        player.remove_card(player.hand[1], index=1)
+        self.assertEqual([c.rank for c in player.hand], ['7', '9'])
+
+        player.remove_card(Card('9', Suit.CLUBS))
+        self.assertEqual([c.rank for c in player.hand], ['7'])
+
+    def test_sort_hand_resorts_only_after_changes(self):
+        """Test sort_hand re-sorts after add_card or a new hand, and otherwise leaves it"""
+        player = Player(name="Test")
+        player.hand = [create_card('9', 'S'), create_card('3', 'S')]
+        player.sort_hand()
+        self.assertEqual([c.rank for c in player.hand], ['3', '9'])
+
+        player.add_card(create_card('5', 'S'))
+        player.sort_hand()
+        self.assertEqual([c.rank for c in player.hand], ['3', '5', '9'])
+
+        player.hand = [create_card('K', 'S'), create_card('4', 'S')]
+        player.sort_hand()
+        self.assertEqual([c.rank for c in player.hand], ['4', 'K'])
+
+        # Reordering the same list in place bypasses add/remove, so a repeat
+        # sort_hand() is skipped and leaves the order as it is
+        player.hand.reverse()
+        player.sort_hand()
+        self.assertEqual([c.rank for c in player.hand], ['K', '4'])
+
 
 class TestMeldFinder(unittest.TestCase):
     """Test meld finding algorithms"""
@@ -133,6 +210,17 @@ class TestMeldFinder(unittest.TestCase):
         can_go, melds = MeldFinder.can_go_out(hand, '4')
         self.assertFalse(can_go)
 
+    def test_can_go_out_cache_returns_callers_cards(self):
+        """A reordered hand hits the cache and gets melds made of its own cards"""
+        MeldFinder.clear_cache()
+        hand = [create_card('7', 'H'), create_card('7', 'S'), create_card('7', 'C')]
+        MeldFinder.can_go_out(hand, '3')
+        reordered = [create_card('7', 'C'), create_card('7', 'H'), create_card('7', 'S')]
+        can_go, melds = MeldFinder.can_go_out(reordered, '3')
+        self.assertTrue(can_go)
+        self.assertEqual(meld_finder._cached_go_out.cache_info().hits, 1)
+        self.assertEqual(sorted(id(c) for c in melds[0]), sorted(id(c) for c in reordered))
+
     def test_find_best_meld_combination(self):
         """Test finding best combination of melds"""
         hand = [
@@ -149,6 +237,38 @@ class TestMeldFinder(unittest.TestCase):
         self.assertEqual(len(melds), 2)
         self.assertEqual(points, 0)  # All cards in melds
 
+    def test_best_combination_uses_duplicate_copies(self):
+        """Two copies of a book form two melds that use every card"""
+        hand = [create_card('7', suit) for suit in 'HSCHSC']
+        melds, points = MeldFinder.find_best_meld_combination(hand, '3')
+        self.assertEqual(points, 0)
+        self.assertEqual(len(melds), 2)
+        self.assertEqual(sorted(id(c) for meld in melds for c in meld), sorted(id(c) for c in hand))
+
+    def test_best_combination_is_exact(self):
+        """A small book that blocks a longer run is not taken"""
+        hand = [
+            create_card('8', 'H'), create_card('8', 'S'), create_card('8', 'C'),
+            create_card('9', 'H'), create_card('10', 'H'),
+            create_card('9', 'S'), create_card('10', 'S'),
+        ]
+        # Book of 8s strands four cards; two runs use everything but 8C
+        melds, points = MeldFinder.find_best_meld_combination(hand, '3')
+        self.assertEqual(points, 8)
+        self.assertEqual(len(melds), 2)
+
+    def test_best_combination_places_wild_three_and_joker(self):
+        """With 3s wild, the wild 3 fills a gap and the Joker extends a run"""
+        hand = [
+            create_card('4', 'S'), create_card('6', 'S'),
+            create_card('4', 'H'), create_card('5', 'H'),
+            create_joker(), create_card('3', 'C'),
+        ]
+        # 4H-5H-3C is rejected by the 3s-wild boundary rule; 4H-5H-Joker is not
+        melds, points = MeldFinder.find_best_meld_combination(hand, '3')
+        self.assertEqual(points, 0)
+        self.assertTrue(MeldValidator.validate_all_melds(melds, '3').is_valid)
+
 
 class TestAIStrategy(unittest.TestCase):
     """Test AI decision-making"""
@@ -184,10 +304,52 @@ class TestAIStrategy(unittest.TestCase):
         # Should discard the K (least useful)
         self.assertEqual(to_discard.rank, 'K')
 
+    def test_usefulness_cache_is_order_independent(self):
+        """The same card against a reordered hand reuses the cached score"""
+        ai_player._usefulness_cache.clear()
+        hand = [create_card('5', 'H'), create_card('6', 'H'), create_card('9', 'S')]
+        first = AIStrategy.evaluate_card_usefulness(hand[0], hand, '3')
+        self.assertEqual(len(ai_player._usefulness_cache), 1)
+        second = AIStrategy.evaluate_card_usefulness(hand[0], list(reversed(hand)), '3')
+        self.assertEqual(first, second)
+        self.assertEqual(len(ai_player._usefulness_cache), 1)
+
+    def test_identical_copies_do_not_count_as_duplicates(self):
+        """A second copy of the same card adds no book or run value"""
+        hand = [create_card('7', 'H'), create_card('7', 'H'), create_card('7', 'S')]
+        score = AIStrategy.evaluate_card_usefulness(hand[0], hand, '3')
+        self.assertEqual(score, 15 - 7 * 0.5)
+
 
 class TestGameEngine(unittest.TestCase):
     """Test game engine"""
 
+    @classmethod
+    def setUpClass(cls):
+        # One seeded, dealt round shared by the tests that only read it
+        rng_state = random.getstate()
+        random.seed(0)
+        cls.dealt = GameEngine([("Player 1", True), ("Computer", False)])
+        cls.dealt.setup_round()
+        random.setstate(rng_state)
+
+    def test_headless_game_is_reproducible(self):
+        """Test a seeded computer-only game replays to the same scores"""
+        # play_game_headless seeds the global RNG; leave it as we found it
+        self.addCleanup(random.setstate, random.getstate())
+        scores = play_game.play_game_headless(seed=3, num_players=3)
+        self.assertEqual(len(scores), 3)
+        self.assertTrue(all(score >= 0 for score in scores))
+        self.assertEqual(play_game.play_game_headless(seed=3, num_players=3), scores)
+
+    def test_headless_games_always_finish(self):
+        """Test headless games end even when nobody goes out (seed 13 used to stall)"""
+        self.addCleanup(random.setstate, random.getstate())
+        for seed in range(10, 16):
+            with self.subTest(seed=seed):
+                scores = play_game.play_game_headless(seed=seed, num_players=2)
+                self.assertEqual(len(scores), 2)
+
     def test_game_initialization(self):
         """Test initializing a game"""
         engine = GameEngine([("Player 1", True), ("Computer", False)])
@@ -196,8 +358,7 @@ class TestGameEngine(unittest.TestCase):
 
     def test_round_setup(self):
         """Test setting up a round"""
-        engine = GameEngine([("Player 1", True), ("Computer", False)])
-        engine.setup_round()
+        engine = self.dealt
 
         # Check that cards were dealt
         cards_per_hand = engine.state.get_cards_per_hand()
@@ -220,8 +381,8 @@ class TestGameEngine(unittest.TestCase):
 
     def test_try_go_out_success(self):
         """Test successfully going out"""
+        # No deal needed: the test sets the hand itself
         engine = GameEngine([("Player 1", True)])
-        engine.setup_round()
 
         player = engine.state.current_player()
 
@@ -246,7 +407,6 @@ class TestGameEngine(unittest.TestCase):
     def test_try_go_out_invalid_melds(self):
         """Test going out with invalid melds"""
         engine = GameEngine([("Player 1", True)])
-        engine.setup_round()
 
         player = engine.state.current_player()
         player.hand = [
@@ -266,6 +426,54 @@ class TestGameEngine(unittest.TestCase):
         self.assertFalse(success)
         self.assertIsNotNone(error)
 
+    def test_try_go_out_counts_duplicate_cards(self):
+        """Test melds must use each copy of a card as often as the hand holds it"""
+        engine = GameEngine([("Player 1", True)])
+        player = engine.state.current_player()
+        # Two 5♠ but only one 5♥; the melds below use 5♥ twice and 5♠ once
+        player.hand = [create_card('5', 'H'), create_card('6', 'H'), create_card('7', 'H'),
+                       create_card('5', 'S'), create_card('5', 'S'), create_card('5', 'C')]
+        melds = [[create_card('5', 'H'), create_card('6', 'H'), create_card('7', 'H')],
+                 [create_card('5', 'H'), create_card('5', 'S'), create_card('5', 'C')]]
+
+        success, error = engine.try_go_out(melds)
+        self.assertFalse(success)
+        self.assertEqual(error, "Melds contain cards not in hand")
+        self.assertEqual(len(player.hand), 6)
+
+
+class TestGameUI(unittest.TestCase):
+    """Test the interactive prompts with scripted input"""
+
+    def test_arrange_melds_rejects_repeated_card(self):
+        """Test a card number entered twice is rejected, not melded twice"""
+        player = Player(name="Test", is_human=True)
+        player.hand = [create_joker(), create_card('7', 'H'), create_card('7', 'S')]
+        output = io.StringIO()
+        with mock.patch('builtins.input', side_effect=['1 1 2', 'done']), \
+                contextlib.redirect_stdout(output):
+            melds, used_positions = play_game.GameUI.let_player_arrange_melds(player, '3')
+        self.assertEqual(melds, [])
+        self.assertEqual(used_positions, set())
+        self.assertIn("Each card can only be used once!", output.getvalue())
+
+    def test_discard_choice_returns_position(self):
+        """Test the chosen discard comes back with its hand position, after a bad entry"""
+        player = Player(name="Test", is_human=True)
+        player.hand = [create_card('7', 'H'), create_card('9', 'S'), create_card('7', 'H')]
+        with mock.patch('builtins.input', side_effect=['4', '3']), \
+                contextlib.redirect_stdout(io.StringIO()):
+            card, index = play_game.GameUI.get_player_discard_choice(player, '3')
+        self.assertEqual((card, index), (create_card('7', 'H'), 2))
+
+    def test_simulate_options_must_be_positive(self):
+        """Test --simulate and --workers reject counts below 1"""
+        self.assertEqual(play_game.parse_args(['--simulate', '1', '--workers', '1']).simulate, 1)
+        for argv in (['--simulate', '0'], ['--simulate', '-1'], ['--workers', '0']):
+            with self.subTest(argv=argv), self.assertRaises(SystemExit), \
+                    contextlib.redirect_stderr(io.StringIO()):
+                play_game.parse_args(argv)
+
 
 if __name__ == '__main__':
-    unittest.main(verbosity=2)
+    unittest.main(verbosity=int(os.environ.get('TEST_VERBOSITY', '1')), buffer=True)